@@ -2,7 +2,6 @@ import os
 import json
 import chromadb
 import requests
-import spacy
 import numpy as np
 import threading
 import concurrent.futures
@@ -10,11 +9,12 @@ import re
 import hashlib
 import time
 from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer, CrossEncoder
 from collections import defaultdict
-from transformers import pipeline
 from dotenv import load_dotenv
 from datetime import datetime
+from model_registry import ModelRegistry
+from bm25_index import BM25Index, tokenize
+from news_store import NewsStore
 
 # Fact Checking queue for google/wiki because the dictionaries are not thread-safe
 # If two threads update them at the same time, data corruption or partial updates may occur
@@ -53,12 +53,53 @@ if not GOOGLE_FACT_CHECK_API_KEY:
 chroma_client = chromadb.PersistentClient(path="./chromadb_store")
 collection = chroma_client.get_or_create_collection("articles")
 
-# Load NLP models
-nlp = spacy.load("en_core_web_trf")  # Transformer-based NER model
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")  # Embeddings for dense retrieval
-cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-12-v2")  # Cross-encoder for claim verification
-sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert/distilbert-base-uncased-finetuned-sst-2-english")
-claim_extractor = pipeline("text2text-generation", model="facebook/bart-large-cnn")
+# Persistent BM25 index of the articles (updated as processed articles are saved)
+BM25_INDEX_PATH = "./chromadb_store/bm25_index.sqlite3"
+bm25_index = BM25Index(BM25_INDEX_PATH)
+
+# TOGGLE: spaCy model for named entities
+# "en_core_web_trf" = most accurate (transformer), "en_core_web_md" / "en_core_web_sm" = much faster for big batches
+NER_MODEL = os.getenv("NER_MODEL", "en_core_web_trf")
+NER_BATCH_SIZE = 32  # Articles per nlp.pipe batch (lower it for the transformer model on small machines)
+NER_N_PROCESS = 1  # >1 runs NER in several processes (each loads its own copy of the model)
+NER_LABELS = {"ORG", "GPE", "PERSON", "PRODUCT"}
+
+# Only "ner" (and the transformer / tok2vec it reads from) is needed to read doc.ents
+NER_EXCLUDED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+
+# NLP models: loaded on first use (or warmed up in the background), not at import time
+def load_nlp():
+    import spacy
+    return spacy.load(NER_MODEL, exclude=NER_EXCLUDED_PIPES)  # NER-only pipeline
+
+
+def load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")  # Embeddings for dense retrieval
+
+
+def load_cross_encoder():
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-12-v2")  # Cross-encoder for claim verification
+
+
+def load_sentiment_analyzer():
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model="distilbert/distilbert-base-uncased-finetuned-sst-2-english")
+
+
+def load_claim_extractor():
+    from transformers import pipeline
+    return pipeline("text2text-generation", model="facebook/bart-large-cnn")
+
+
+models = ModelRegistry()
+models.register("nlp", load_nlp)
+models.register("embedding_model", load_embedding_model)
+models.register("cross_encoder", load_cross_encoder)
+models.register("sentiment_analyzer", load_sentiment_analyzer)
+models.register("claim_extractor", load_claim_extractor)  # Not used by the pipeline yet, so never warmed up
 
 def get_current_timestamp():
     """Returns the current timestamp in ISO format."""
@@ -189,28 +230,57 @@ def multi_hop_fact_checking(entities):
 
 
 def rank_fact_checks(fact_check_results, query):
-    scores = cross_encoder.predict([(query, claim) for claim in fact_check_results])
+    scores = models.get("cross_encoder").predict([(query, claim) for claim in fact_check_results])
     ranked_claims = [claim for _, claim in sorted(zip(scores, fact_check_results), reverse=True)]
     return ranked_claims
 
 
 # Function to extract and filter meaningful entities
 def extract_entities(text):
-    doc = nlp(text)
-    filtered_entities = [ent.text for ent in doc.ents if ent.label_ in {"ORG", "GPE", "PERSON", "PRODUCT"}]
-    return list(set(filtered_entities))  # Remove duplicates
+    return extract_entities_batch([text])[0]
+
+
+def extract_entities_batch(texts, batch_size=NER_BATCH_SIZE, n_process=NER_N_PROCESS):
+    """
+    Runs NER over many articles at once with nlp.pipe (batched, optionally multi-process).
+
+    Args:
+    - texts (list): Article texts.
+    - batch_size (int): Texts per spaCy batch.
+    - n_process (int): Worker processes for spaCy (1 = this process).
+
+    Returns:
+    - list: For each text, its unique ORG / GPE / PERSON / PRODUCT entities.
+    """
+    nlp = models.get("nlp")
+    results = []
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        filtered_entities = [ent.text for ent in doc.ents if ent.label_ in NER_LABELS]
+        results.append(list(set(filtered_entities)))  # Remove duplicates
+    return results
 
 # BM25 Retrieval
-def compute_bm25_rankings(documents, query):
-    tokenized_docs = [doc.split() for doc in documents]
-    bm25 = BM25Okapi(tokenized_docs)
-    tokenized_query = query.split()
-    scores = bm25.get_scores(tokenized_query)
+def compute_bm25_rankings(documents, query, doc_ids=None):
+    """
+    Ranks documents with BM25.
+
+    With `doc_ids` (the documents' ChromaDB ids) the scores come from the persistent index's
+    posting lists, so nothing is re-tokenized; documents sharing no term with the query are
+    left out. Without ids (texts that aren't in the collection) a one-off in-memory model is built.
+    """
+    if doc_ids is not None:
+        text_by_id = dict(zip(doc_ids, documents))
+        ranked = bm25_index.search(query, top_k=len(text_by_id), keys=text_by_id)
+        return [text_by_id[doc_id] for doc_id, _ in ranked]
+
+    bm25 = BM25Okapi([tokenize(doc) or [""] for doc in documents])
+    scores = bm25.get_scores(tokenize(query))
     ranked_docs = sorted(zip(documents, scores), key=lambda x: x[1], reverse=True)
     return [doc for doc, _ in ranked_docs]
 
 # Dense Retrieval
 def compute_dense_rankings(documents, query):
+    embedding_model = models.get("embedding_model")
     query_embedding = embedding_model.encode(query)
     doc_embeddings = embedding_model.encode(documents)
     similarities = (doc_embeddings @ query_embedding.T).tolist()
@@ -228,13 +298,14 @@ def reciprocal_rank_fusion(bm25_results, dense_results, k=60):
 
 print(f"Running hybrid search for similar articles related to article...")
 # Hybrid Search Function
-def hybrid_search(query, documents, mode="hybrid"):
+def hybrid_search(query, documents, mode="hybrid", doc_ids=None):
     """
     Perform hybrid document retrieval using BM25 and/or Dense Retrieval.
 
     Parameters:
     - query (str): The search query.
     - documents (list of str): List of documents to search in.
+    - doc_ids (list of str): The documents' ChromaDB ids, so BM25 is answered by the persistent index.
     - mode (str): 
         - "bm25" → BM25-only retrieval
         - "dense" → Dense embeddings retrieval
@@ -248,7 +319,7 @@ def hybrid_search(query, documents, mode="hybrid"):
 
     # ✅ Run BM25 if "bm25" or "hybrid" mode is selected
     if mode in {"bm25", "hybrid"}:
-        bm25_results = compute_bm25_rankings(documents, query)
+        bm25_results = compute_bm25_rankings(documents, query, doc_ids)
 
     # ✅ Run Dense Retrieval if "dense" or "hybrid" mode is selected
     if mode in {"dense", "hybrid"}:
@@ -265,59 +336,87 @@ def hybrid_search(query, documents, mode="hybrid"):
 import numpy as np
 from nltk.tokenize import sent_tokenize
 
-def sentiment_analysis(text, chunk_size=512):
+SENTIMENT_BATCH_SIZE = 32  # Chunks per forward pass
+
+
+def chunk_by_tokens(text, tokenizer, max_tokens):
     """
-    Process sentiment analysis on large text by splitting it into sentence-based chunks
-    and computing a weighted average sentiment score.
+    Splits text into sentence-aligned chunks of at most `max_tokens` model tokens.
+
+    Returns:
+    - list of (chunk, token_count). A single sentence longer than the limit becomes its own
+      chunk and is truncated by the pipeline.
+    """
+    sentences = [sentence for sentence in sent_tokenize(text) if sentence.strip()]
+    if not sentences:
+        return []
+    sentence_tokens = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+
+    chunks = []
+    current_chunk, current_length = [], 0
+    for sentence, length in zip(sentences, sentence_tokens):
+        if current_chunk and current_length + length > max_tokens:
+            chunks.append((" ".join(current_chunk), current_length))
+            current_chunk, current_length = [], 0
+        current_chunk.append(sentence)
+        current_length += length
+    if current_chunk:
+        chunks.append((" ".join(current_chunk), current_length))
+    return chunks
+
+
+def sentiment_analysis_batch(texts, batch_size=SENTIMENT_BATCH_SIZE):
+    """
+    Sentiment for many articles in one batched pass.
+
+    Every article is split into chunks that fit the model's token limit; the chunks of all
+    articles are sorted by length (less padding per batch) and classified together, then each
+    article gets the token-weighted average of its chunks' signed scores.
 
     Parameters:
-    - text (str): The input text.
-    - chunk_size (int): The maximum length of each chunk (default: 512 for BERT models).
+    - texts (list of str): The articles.
+    - batch_size (int): Chunks per forward pass.
 
     Returns:
-    - float: The weighted sentiment score across all chunks.
+    - list of float: One weighted sentiment score per article, in [-1, 1] (0 for empty texts).
     """
+    sentiment_analyzer = models.get("sentiment_analyzer")
+    tokenizer = sentiment_analyzer.tokenizer
+    max_tokens = min(tokenizer.model_max_length, 512) - tokenizer.num_special_tokens_to_add()
 
-    sentences = sent_tokenize(text)
-    chunks = []
-    current_chunk = []
-    current_length = 0
-    chunk_lengths = []  # Stores sentence count per chunk for weighted averaging
+    chunks, owners, weights = [], [], []
+    for article_index, text in enumerate(texts):
+        for chunk, token_count in chunk_by_tokens(text or "", tokenizer, max_tokens):
+            chunks.append(chunk)
+            owners.append(article_index)
+            weights.append(min(token_count, max_tokens))
+    if not chunks:
+        return [0.0] * len(texts)
 
-    # Split text into chunks
-    for sentence in sentences:
-        sentence_length = len(sentence)
-        
-        if current_length + sentence_length > chunk_size:
-            chunks.append(" ".join(current_chunk))
-            chunk_lengths.append(len(current_chunk))  # Track sentence count
-            current_chunk = [sentence]
-            current_length = sentence_length
-        else:
-            current_chunk.append(sentence)
-            current_length += sentence_length
+    order = np.argsort(weights, kind="stable")
+    results = sentiment_analyzer([chunks[i] for i in order], batch_size=batch_size, truncation=True)
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-        chunk_lengths.append(len(current_chunk))
-
-    sentiment_scores = []
-
-    # Analyze sentiment for each chunk
-    for chunk in chunks:
-        result = sentiment_analyzer(chunk)
-        label = result[0]["label"]
-        score = result[0]["score"]
-        numerical_score = score if label == "POSITIVE" else -score
-        sentiment_scores.append(numerical_score)
-
-    # Compute weighted average sentiment score
-    if sentiment_scores:
-        weighted_avg_sentiment = np.average(sentiment_scores, weights=chunk_lengths)
-    else:
-        weighted_avg_sentiment = 0  # Default value if no sentiment scores are computed
+    signed_scores = np.empty(len(chunks))
+    signed_scores[order] = [r["score"] if r["label"] == "POSITIVE" else -r["score"] for r in results]
 
-    return weighted_avg_sentiment
+    owners = np.asarray(owners)
+    weights = np.asarray(weights, dtype=float)
+    totals = np.bincount(owners, weights=weights * signed_scores, minlength=len(texts))
+    norms = np.bincount(owners, weights=weights, minlength=len(texts))
+    return np.divide(totals, norms, out=np.zeros(len(texts)), where=norms > 0).tolist()
+
+
+def sentiment_analysis(text):
+    """
+    Weighted sentiment score of one text (see sentiment_analysis_batch).
+
+    Parameters:
+    - text (str): The input text.
+
+    Returns:
+    - float: The weighted sentiment score across all chunks.
+    """
+    return sentiment_analysis_batch([text])[0]
 
 
 
@@ -339,13 +438,14 @@ def generate_text_hash(text):
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 # Function to process and enrich articles
-def process_article(doc_id, text):
+def process_article(doc_id, text, entities=None, sentiment_score=None):
     print(f"Processing article: {doc_id}")
     
 
-    # Extract metadata
-    print(f"Extracting entities from article {doc_id}...")
-    entities = extract_entities(text)
+    # Extract metadata (process_articles passes entities from its batched NER pass)
+    if entities is None:
+        print(f"Extracting entities from article {doc_id}...")
+        entities = extract_entities(text)
 
      # Ensure all retrieved articles have timestamps
     search_results = fetch_from_chromadb(
@@ -382,6 +482,7 @@ def process_article(doc_id, text):
 
     # Extract document texts for similarity search
     search_texts = [res["documents"][0] for res in sorted_results] if sorted_results else []
+    search_ids = [res.get("id") for res in sorted_results]
 
     # Choose retrieval mode dynamically
     # This saves time because you don't always need to run both
@@ -398,7 +499,10 @@ def process_article(doc_id, text):
         retrieval_mode = RETRIEVAL_MODE
 
     # Run optimized Hybrid Search
-    related_articles = hybrid_search(text, search_texts, mode=retrieval_mode) if search_texts else []
+    related_articles = (
+        hybrid_search(text, search_texts, mode=retrieval_mode, doc_ids=search_ids if all(search_ids) else None)
+        if search_texts else []
+    )
 
     print(f"🔎 Running multi-hop fact-checking for article {doc_id}...")
     # Initialize empty dictionaries to store results (critical fix)
@@ -449,9 +553,10 @@ def process_article(doc_id, text):
         wikipedia_summaries[entity] = summary  # Store safely in dictionary
 
 
-    # Compute linguistic insights
-    print(f"Running sentiment analysis for article {doc_id}...")
-    sentiment_score = sentiment_analysis(text)
+    # Compute linguistic insights (process_articles passes the score from its batched pass)
+    if sentiment_score is None:
+        print(f"Running sentiment analysis for article {doc_id}...")
+        sentiment_score = sentiment_analysis(text)
     named_entity_density = len(entities) / max(len(text.split()), 1)
     linguistic_features = {
         "sentiment_score": sentiment_score,
@@ -516,7 +621,12 @@ def process_article(doc_id, text):
 
     # Store updated metadata in ChromaDB
     print(f"Storing processed article {doc_id} in ChromaDB...")
-    save_to_chromadb(doc_id, text, enriched_metadata)
+    if save_to_chromadb(doc_id, text, enriched_metadata):
+        # Searchable by BM25 from now on (outside the retry loop: ChromaDB already has the article)
+        try:
+            bm25_index.add(doc_id, text)
+        except Exception as e:
+            print(f"⚠️ Could not add {doc_id} to the BM25 index (added on the next sync): {e}")
 
     print(f"Article {doc_id} processed and marked as 'ready'.")
 
@@ -535,6 +645,14 @@ def process_article(doc_id, text):
 
 # Function to process all unprocessed articles
 def process_articles():
+    # Load the models every article needs in the background while ChromaDB is queried
+    models.warm_up(["nlp", "sentiment_analyzer", "cross_encoder"])
+
+    # Index any stored articles the BM25 index doesn't know yet (first run, or a deleted index file)
+    added = bm25_index.sync(NewsStore(collection))
+    if added:
+        print(f"📚 Added {added} articles to the BM25 index ({len(bm25_index)} indexed).")
+
     print("Fetching unprocessed articles from ChromaDB...")
     results = fetch_from_chromadb(
     where={
@@ -557,6 +675,20 @@ def process_articles():
     print(f"Processing {num_to_process} out of {doc_count} pending articles...")
 
     processed_entries = {}
+    doc_ids = results["ids"][:num_to_process]
+    texts = results["documents"][:num_to_process]
+
+    # Named entities for every pending article in one batched spaCy pass
+    print(f"Extracting entities from {len(texts)} articles ({NER_MODEL}, batch size {NER_BATCH_SIZE})...")
+    started = time.perf_counter()
+    entities_by_doc = dict(zip(doc_ids, extract_entities_batch(texts)))
+    print(f"Entities extracted in {time.perf_counter() - started:.1f}s.")
+
+    # Sentiment for every pending article, chunks of all articles batched together
+    print(f"Running sentiment analysis for {len(texts)} articles...")
+    started = time.perf_counter()
+    sentiment_by_doc = dict(zip(doc_ids, sentiment_analysis_batch(texts)))
+    print(f"Sentiment computed in {time.perf_counter() - started:.1f}s.")
 
     # Use ThreadPoolExecutor for parallel processing
 
@@ -567,8 +699,8 @@ def process_articles():
     '''
     with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:  # Adjust max_workers as needed
         future_to_doc = {
-            executor.submit(process_article, doc_id, text): doc_id
-            for doc_id, text in zip(results["ids"][:num_to_process], results["documents"][:num_to_process])
+            executor.submit(process_article, doc_id, text, entities_by_doc[doc_id], sentiment_by_doc[doc_id]): doc_id
+            for doc_id, text in zip(doc_ids, texts)
         }
 
         for future in concurrent.futures.as_completed(future_to_doc):
@@ -580,6 +712,8 @@ def process_articles():
                 print(f"Error processing article {doc_id}: {e}")
 
     print("🏁 All articles processed!")
+    print("📊 Model load times and memory:")
+    models.report()
     print(f"📁 Debug output saving to {DEBUG_OUTPUT_DIR}...")
 
     # Write a single JSON file with all processed data
@@ -611,6 +745,10 @@ if __name__ == "__main__":
 #
 # python -m spacy download en_core_web_trf
 #
+# For faster, high-volume runs use a small model instead:
+# python -m spacy download en_core_web_sm
+# NER_MODEL=en_core_web_sm python RAG_processing.py
+#
 # Important!! ****  If you haven’t downloaded the spaCy language model, you need to.
 # 
 # To run on GPU:
@@ -0,0 +1,209 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+# On-disk cache for scraped article pages.
+# Blobs (raw HTML and final extracted text) are stored content-addressed (named by their SHA-256),
+# and a small SQLite index maps each normalized URL to its blobs plus the HTTP validators
+# (ETag / Last-Modified) needed to revalidate it with a conditional request.
+
+class ArticleCache:
+    def __init__(self, cache_dir="scrape_cache", ttl=7 * 24 * 3600, max_bytes=1024 ** 3):
+        """
+        Args:
+        - cache_dir (str): Directory holding the index and the blobs.
+        - ttl (int): Seconds an entry is served without revalidation.
+        - max_bytes (int): Size budget for stored blobs; least recently used entries are evicted past it.
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Sharded workers share the cache
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url_key TEXT PRIMARY KEY,
+                html_blob TEXT,
+                text_blob TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_access REAL,
+                size INTEGER DEFAULT 0
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    # ---------- blobs ----------
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.gz")
+
+    def _write_blob(self, content):
+        """Stores a string content-addressed and returns (digest, compressed size)."""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=5) as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Atomic, so readers never see half a blob
+        return digest, os.path.getsize(path)
+
+    def _read_blob(self, digest):
+        if not digest:
+            return ""
+        try:
+            with gzip.open(self._blob_path(digest), "rb") as f:
+                return f.read().decode("utf-8")
+        except (OSError, EOFError):
+            return ""  # Blob evicted or corrupt: treat as a miss
+
+    def _delete_blob_if_unused(self, digest):
+        if not digest:
+            return
+        in_use = self.db.execute(
+            "SELECT 1 FROM entries WHERE html_blob = ? OR text_blob = ? LIMIT 1", (digest, digest)
+        ).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    # ---------- lookups ----------
+
+    def lookup(self, url_key):
+        """Returns the cache entry for a normalized URL as a dict, or None."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url_key, html_blob, text_blob, etag, last_modified, fetched_at FROM entries WHERE url_key = ?",
+                (url_key,)
+            ).fetchone()
+        if not row:
+            return None
+        keys = ("url_key", "html_blob", "text_blob", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry):
+        """True if the entry is younger than the TTL and can be served without asking the server."""
+        return entry is not None and (time.time() - (entry["fetched_at"] or 0)) < self.ttl
+
+    def conditional_headers(self, entry):
+        """Headers for a conditional GET that lets the server answer 304 Not Modified."""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read_html(self, entry):
+        return self._read_blob(entry.get("html_blob"))
+
+    def read_text(self, entry):
+        return self._read_blob(entry.get("text_blob"))
+
+    def touch(self, url_key, revalidated=False):
+        """Marks an entry as used (and, after a 304, as freshly validated)."""
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.db.execute(
+                    "UPDATE entries SET last_access = ?, fetched_at = ? WHERE url_key = ?", (now, now, url_key)
+                )
+            else:
+                self.db.execute("UPDATE entries SET last_access = ? WHERE url_key = ?", (now, url_key))
+            self.db.commit()
+
+    # ---------- writes ----------
+
+    def store_html(self, url_key, html, etag=None, last_modified=None):
+        """Caches a freshly downloaded page together with its HTTP validators."""
+        digest, _ = self._write_blob(html)
+        now = time.time()
+        with self.lock:
+            old = self.db.execute("SELECT html_blob FROM entries WHERE url_key = ?", (url_key,)).fetchone()
+            self.db.execute("""
+                INSERT INTO entries (url_key, html_blob, text_blob, etag, last_modified, fetched_at, last_access)
+                VALUES (?, ?, NULL, ?, ?, ?, ?)
+                ON CONFLICT(url_key) DO UPDATE SET
+                    html_blob = excluded.html_blob,
+                    text_blob = CASE WHEN entries.html_blob = excluded.html_blob THEN entries.text_blob END,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    last_access = excluded.last_access
+            """, (url_key, digest, etag, last_modified, now, now))
+            if old and old[0] != digest:
+                self._delete_blob_if_unused(old[0])
+            self._update_size(url_key)
+            self.db.commit()
+            self._evict()
+
+    def store_text(self, url_key, text):
+        """Caches the final extracted text for an entry whose HTML is already cached."""
+        digest, _ = self._write_blob(text)
+        with self.lock:
+            self.db.execute("UPDATE entries SET text_blob = ? WHERE url_key = ?", (digest, url_key))
+            self._update_size(url_key)
+            self.db.commit()
+            self._evict()
+
+    def _update_size(self, url_key):
+        row = self.db.execute(
+            "SELECT html_blob, text_blob, size FROM entries WHERE url_key = ?", (url_key,)
+        ).fetchone()
+        if not row:
+            return
+        html_blob, text_blob, old_size = row
+        size = sum(
+            os.path.getsize(self._blob_path(d)) for d in (html_blob, text_blob)
+            if d and os.path.exists(self._blob_path(d))
+        )
+        self.db.execute("UPDATE entries SET size = ? WHERE url_key = ?", (size, url_key))
+        self.total_bytes += size - (old_size or 0)
+
+    def _evict(self):
+        """Drops least recently used entries until the cache is back under 90% of its budget."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self.db.execute(
+            "SELECT url_key, html_blob, text_blob, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for url_key, html_blob, text_blob, size in rows:
+            if self.total_bytes <= target:
+                break
+            self.db.execute("DELETE FROM entries WHERE url_key = ?", (url_key,))
+            self._delete_blob_if_unused(html_blob)
+            self._delete_blob_if_unused(text_blob)
+            self.total_bytes -= size or 0
+            self.stats["evictions"] += 1
+        self.db.commit()
+
+    def summary(self):
+        """Returns hit/miss counters plus current cache size."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            "size_mb": round(self.total_bytes / 1024 ** 2, 2),
+        }
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+import chromadb
+from aiohttp import web
+
+from data_collect import NewsScraper
+
+
+# Offline throughput benchmark for data_collect.py.
+# A local aiohttp server stands in for both mediastack (paginated JSON at /v1/news) and the news sites
+# (synthetic article pages). Each "site" listens on its own port, so the scraper's per-domain limits
+# apply just like they do against real hosts. Run it before and after every scraper performance change:
+#
+#   python benchmark_scraper.py --articles 500 --latency 0.2 --jitter 0.1 --failure-rate 0.05
+#
+# Reports articles/sec, p50/p95 per-article extraction latency and peak RSS.
+
+HOST = "127.0.0.1"
+PAGE_SIZE = 100  # mediastack's max `limit`, which is what NewsScraper asks for
+
+WORDS = (
+    "government market election climate energy report court city police health school company "
+    "minister economy policy workers growth prices vote council research science technology data "
+    "security budget trade border water storm hospital students officials investors season league "
+    "team coach players museum festival artists film music community families residents village"
+).split()
+
+
+class FakeNewsServer:
+    def __init__(self, articles=500, domains=8, sources=20, paragraphs=12, padding_kb=0, latency=0.1,
+                 jitter=0.05, api_latency=0.2, failure_rate=0.0, js_rate=0.0, seed=42):
+        """
+        Args:
+        - articles (int): Total articles the fake API serves.
+        - domains (int): Number of fake news sites (one port each).
+        - sources (int): Number of distinct `source` values (affects the per-source quota).
+        - paragraphs (int): Paragraphs of article text per page.
+        - padding_kb (int): Extra inline script/markup per page, to simulate bloated pages.
+        - latency (float): Mean response delay of article pages, in seconds.
+        - jitter (float): Article delays are spread uniformly over latency ± jitter.
+        - api_latency (float): Response delay of the fake API, in seconds.
+        - failure_rate (float): Share of article pages answering 500 (the same pages on every run).
+        - js_rate (float): Share of article pages whose text is only inserted by JavaScript.
+        - seed (int): Seed for the synthetic text, failures and JS-only pages.
+        """
+        self.articles = articles
+        self.domains = domains
+        self.sources = sources
+        self.paragraphs = paragraphs
+        self.padding = "x" * (padding_kb * 1024)
+        self.latency = latency
+        self.jitter = jitter
+        self.api_latency = api_latency
+        self.failure_rate = failure_rate
+        self.js_rate = js_rate
+        self.seed = seed
+        self.ports = []
+        self.runner = None
+        self.requests = 0
+
+    # ---------- synthetic content ----------
+
+    def article_url(self, article_id):
+        return f"http://{HOST}:{self.ports[article_id % self.domains]}/article/{article_id}"
+
+    def api_article(self, article_id):
+        """One mediastack-style result."""
+        return {
+            "author": f"Reporter {article_id % 37}",
+            "title": f"Benchmark story {article_id}",
+            "description": f"Synthetic article {article_id} for the offline scraper benchmark.",
+            "url": self.article_url(article_id),
+            "source": f"source-{article_id % self.sources}",
+            "image": None,
+            "category": "general",
+            "language": "en",
+            "country": "us",
+            "published_at": f"2025-01-{article_id % 28 + 1:02d}T12:00:00+00:00",
+        }
+
+    def article_paragraphs(self, article_id):
+        # Seeded per article, so texts are distinct (no near-duplicate skips) but stable across runs
+        rng = random.Random(self.seed * 1_000_003 + article_id)
+        return [" ".join(rng.choice(WORDS) for _ in range(60)).capitalize() + "." for _ in range(self.paragraphs)]
+
+    def page_kind(self, article_id):
+        """"fail", "js" or "static" (deterministic for a given seed)."""
+        roll = random.Random(self.seed * 7_919 + article_id).random()
+        if roll < self.failure_rate:
+            return "fail"
+        if roll < self.failure_rate + self.js_rate:
+            return "js"
+        return "static"
+
+    def render_article(self, article_id, js_only=False):
+        paragraphs = self.article_paragraphs(article_id)
+        padding = f"<script>var padding = '{self.padding}';</script>" if self.padding else ""
+        if js_only:
+            body = (
+                '<div id="app"></div><script>'
+                f"var paragraphs = {json.dumps(paragraphs)};"
+                "document.getElementById('app').innerHTML = paragraphs.map(function (p) {"
+                " return '<' + 'p>' + p + '</' + 'p>'; }).join('');"
+                "</script>"
+            )
+        else:
+            body = "".join(f"<p>{p}</p>" for p in paragraphs)
+        return (
+            f"<html><head><title>Benchmark story {article_id}</title>{padding}</head>"
+            f"<body><article>{body}</article></body></html>"
+        )
+
+    # ---------- handlers ----------
+
+    async def delay(self, mean):
+        if mean > 0 or self.jitter > 0:
+            await asyncio.sleep(max(0.0, random.uniform(mean - self.jitter, mean + self.jitter)))
+
+    async def handle_api(self, request):
+        self.requests += 1
+        if self.api_latency > 0:
+            await asyncio.sleep(self.api_latency)
+        offset = int(request.query.get("offset", 0))
+        limit = min(int(request.query.get("limit", PAGE_SIZE)), PAGE_SIZE)
+        ids = range(offset, min(offset + limit, self.articles))
+        return web.json_response({
+            "pagination": {"limit": limit, "offset": offset, "count": len(ids), "total": self.articles},
+            "data": [self.api_article(article_id) for article_id in ids],
+        })
+
+    async def handle_article(self, request):
+        self.requests += 1
+        article_id = int(request.match_info["article_id"])
+        await self.delay(self.latency)
+        kind = self.page_kind(article_id)
+        if kind == "fail" or article_id >= self.articles:
+            return web.Response(status=500, text="Internal Server Error")
+        return web.Response(text=self.render_article(article_id, js_only=kind == "js"), content_type="text/html")
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        """Starts one listener per fake site; the first one also serves the API."""
+        app = web.Application()
+        app.router.add_get("/v1/news", self.handle_api)
+        app.router.add_get("/article/{article_id:\\d+}", self.handle_article)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        for _ in range(self.domains):
+            site = web.TCPSite(self.runner, HOST, 0)
+            await site.start()
+        self.ports = [address[1] for address in self.runner.addresses]
+
+    @property
+    def api_url(self):
+        return f"http://{HOST}:{self.ports[0]}/v1/news"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its (reaped) children, e.g. the parser pool (None where unavailable)."""
+    if resource is None:
+        return {"self": None, "children": None}
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def run_benchmark(args):
+    server = FakeNewsServer(
+        articles=args.articles, domains=args.domains, sources=args.sources, paragraphs=args.paragraphs,
+        padding_kb=args.padding_kb, latency=args.latency, jitter=args.jitter, api_latency=args.api_latency,
+        failure_rate=args.failure_rate, js_rate=args.js_rate, seed=args.seed
+    )
+    await server.start()
+    print(f"🧪 Fake mediastack at {server.api_url}, {args.domains} fake sites on ports {server.ports}")
+
+    with tempfile.TemporaryDirectory(prefix="scraper_bench_") as work_dir:
+        scraper = NewsScraper(
+            api_key="benchmark",
+            max_articles=args.articles,
+            max_api_calls=-(-args.articles // PAGE_SIZE),
+            save_json=args.save_json,
+            max_concurrency=args.max_concurrency,
+            per_domain_concurrency=args.per_domain_concurrency,
+            max_per_source=args.articles,  # Measure throughput, not the quota
+            parse_workers=args.parse_workers,
+            use_cache=args.use_cache,
+            cache_dir=os.path.join(work_dir, "scrape_cache"),
+            api_calls_per_minute=6000,
+            api_burst=args.prefetch_pages + 1,
+            prefetch_pages=args.prefetch_pages,
+            max_page_mb=args.max_page_mb,
+            early_stop_chars=args.early_stop_chars,
+            chroma_client=chromadb.PersistentClient(path=os.path.join(work_dir, "chroma_db")),
+            base_url=server.api_url,
+            news_dir=os.path.join(work_dir, "NEWS_FILES"),
+            state_dir=os.path.join(work_dir, "scraper_state"),
+            index_dir=os.path.join(work_dir, "chroma_db"),
+        )
+
+        # Time every article's extraction (download + parse) from the outside
+        latencies = []
+        extract_full_text = scraper.extract_full_text
+
+        async def timed_extract_full_text(session, url):
+            started = time.perf_counter()
+            try:
+                return await extract_full_text(session, url)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        scraper.extract_full_text = timed_extract_full_text
+
+        started = time.perf_counter()
+        try:
+            await scraper.fetch_articles()
+        finally:
+            elapsed = time.perf_counter() - started
+            await scraper.close_browser()
+            scraper.close_parse_pool()
+            await server.stop()
+
+    results = {
+        "articles_requested": args.articles,
+        "articles_stored": scraper.articles_fetched,
+        "articles_committed": scraper.database.total_articles_saved,
+        "extractions": len(latencies),
+        "http_requests": server.requests,
+        "elapsed_seconds": round(elapsed, 2),
+        "articles_per_second": round(scraper.articles_fetched / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "settings": vars(args),
+    }
+
+    print("\n📊 Benchmark results")
+    print(f"   Articles stored:     {results['articles_stored']}/{args.articles} in {results['elapsed_seconds']}s")
+    print(f"   Articles committed:  {results['articles_committed']}")
+    print(f"   Throughput:          {results['articles_per_second']} articles/sec")
+    print(f"   Extraction latency:  p50 {results['latency_p50']}s | p95 {results['latency_p95']}s")
+    if resource is not None:
+        print(f"   Peak RSS:            {results['peak_rss_mb']['self']} MB (parser processes: {results['peak_rss_mb']['children']} MB)")
+    else:
+        print("   Peak RSS:            n/a (no resource module on this platform)")
+    if results["articles_stored"] and not results["articles_committed"]:
+        print("❌ No article reached ChromaDB: every commit failed, so these numbers don't include the commit stage.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark NewsScraper against a local fake mediastack and news sites.")
+    site = parser.add_argument_group("fake sites")
+    site.add_argument("--articles", type=int, default=500, help="Articles served by the fake API (default: 500)")
+    site.add_argument("--domains", type=int, default=8, help="Number of fake news sites (default: 8)")
+    site.add_argument("--sources", type=int, default=20, help="Distinct article sources (default: 20)")
+    site.add_argument("--paragraphs", type=int, default=12, help="Paragraphs per article (default: 12)")
+    site.add_argument("--padding-kb", type=int, default=0, help="Extra inline script per page, in KB (default: 0)")
+    site.add_argument("--latency", type=float, default=0.1, help="Mean article page delay in seconds (default: 0.1)")
+    site.add_argument("--jitter", type=float, default=0.05, help="Uniform jitter on page delays in seconds (default: 0.05)")
+    site.add_argument("--api-latency", type=float, default=0.2, help="Fake API delay in seconds (default: 0.2)")
+    site.add_argument("--failure-rate", type=float, default=0.0, help="Share of pages answering 500 (default: 0)")
+    site.add_argument("--js-rate", type=float, default=0.0, help="Share of JavaScript-only pages (default: 0)")
+    site.add_argument("--seed", type=int, default=42, help="Seed for text, failures and JS-only pages (default: 42)")
+
+    scraper = parser.add_argument_group("scraper")
+    scraper.add_argument("--max-concurrency", type=int, default=20)
+    scraper.add_argument("--per-domain-concurrency", type=int, default=2)
+    scraper.add_argument("--parse-workers", type=int, default=None)
+    scraper.add_argument("--prefetch-pages", type=int, default=2)
+    scraper.add_argument("--max-page-mb", type=float, default=5, help="Download cap per page (default: 5)")
+    scraper.add_argument("--early-stop-chars", type=int, default=None,
+                         help="Stop downloading once this much paragraph text has arrived")
+    scraper.add_argument("--use-cache", action="store_true", help="Enable the article cache (starts empty)")
+    scraper.add_argument("--save-json", action="store_true", help="Also write the NEWS_FILES archive")
+
+    parser.add_argument("--json", metavar="PATH", help="Write the results to a JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    results = asyncio.run(run_benchmark(parse_args()))
+    if results["articles_stored"] and not results["articles_committed"]:
+        sys.exit(1)  # Not an end-to-end run
@@ -0,0 +1,243 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+import numpy as np
+
+
+# Persistent BM25 index over the processed articles, for the lexical half of hybrid_search in RAG_processing.py.
+# Postings are stored clustered by term (one contiguous range per posting list) in a memory-mapped SQLite file,
+# and the corpus statistics BM25 needs (document count, total length, per-term document frequency) are kept up
+# to date on every add/remove. A query restricted to candidate documents only looks up the (term, document)
+# postings of those candidates, so its cost follows the candidate count, not the corpus size.
+
+MMAP_SIZE = 256 * 1024 ** 2  # Bytes of the index file SQLite reads through mmap instead of read() calls
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our she that the "
+    "their them they this to was we were which who will with you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercased word tokens (punctuation stripped, apostrophes kept inside words, common stopwords dropped)."""
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, path, k1=1.5, b=0.75):
+        """
+        Args:
+        - path (str): SQLite file holding the index.
+        - k1 (float): Term-frequency saturation.
+        - b (float): Document-length normalization.
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc INTEGER PRIMARY KEY,
+                key TEXT UNIQUE,
+                length INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT,
+                doc INTEGER,
+                tf INTEGER,
+                PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                doc_count INTEGER,
+                total_length INTEGER
+            );
+            INSERT OR IGNORE INTO stats (id, doc_count, total_length) VALUES (0, 0, 0);
+        """)
+        # Index files written before document frequencies were stored: count them once
+        if self.db.execute("SELECT 1 FROM postings LIMIT 1").fetchone() and \
+                not self.db.execute("SELECT 1 FROM terms LIMIT 1").fetchone():
+            self.db.execute("INSERT INTO terms (term, df) SELECT term, COUNT(*) FROM postings GROUP BY term")
+        self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT doc_count FROM stats").fetchone()[0]
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM docs WHERE key = ?", (key,)).fetchone() is not None
+
+    def add(self, key, text):
+        self.add_many([(key, text)])
+
+    def add_many(self, items):
+        """
+        Indexes (key, text) pairs in a single transaction; a key that is already indexed is replaced.
+
+        Args:
+        - items (iterable): (document id, document text) pairs.
+        """
+        tokenized = [(key, Counter(tokenize(text))) for key, text in items if key]
+        if not tokenized:
+            return
+        with self.lock:
+            with self.db:
+                for key, term_counts in tokenized:
+                    self._remove(key)
+                    length = sum(term_counts.values())
+                    doc = self.db.execute(
+                        "INSERT INTO docs (key, length) VALUES (?, ?)", (key, length)
+                    ).lastrowid
+                    self.db.executemany(
+                        "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                        [(term, doc, tf) for term, tf in term_counts.items()]
+                    )
+                    self.db.executemany(
+                        "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT (term) DO UPDATE SET df = df + 1",
+                        [(term,) for term in term_counts]
+                    )
+                    self.db.execute(
+                        "UPDATE stats SET doc_count = doc_count + 1, total_length = total_length + ?", (length,)
+                    )
+
+    def remove(self, key):
+        with self.lock:
+            with self.db:
+                self._remove(key)
+
+    def _remove(self, key):
+        row = self.db.execute("SELECT doc, length FROM docs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        doc, length = row
+        terms = self.db.execute("SELECT term FROM postings WHERE doc = ?", (doc,)).fetchall()
+        self.db.executemany("UPDATE terms SET df = df - 1 WHERE term = ?", terms)
+        self.db.executemany("DELETE FROM terms WHERE term = ? AND df <= 0", terms)
+        self.db.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        self.db.execute("DELETE FROM docs WHERE doc = ?", (doc,))
+        self.db.execute(
+            "UPDATE stats SET doc_count = doc_count - 1, total_length = total_length - ?", (length,)
+        )
+
+    def _select_in(self, query, values, params=()):
+        """
+        Runs `query` (with one `{}` placeholder for the IN list) over values, 500 at a time.
+        `params` are bound before the IN list.
+        """
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), 500):  # Stay under SQLite's bound-parameter limit
+            chunk = values[i:i + 500]
+            rows.extend(self.db.execute(query.format(",".join("?" * len(chunk))), [*params, *chunk]).fetchall())
+        return rows
+
+    def missing_keys(self, keys):
+        """Returns the subset of `keys` that isn't indexed yet."""
+        keys = list(dict.fromkeys(key for key in keys if key))
+        with self.lock:
+            found = {key for key, in self._select_in("SELECT key FROM docs WHERE key IN ({})", keys)}
+        return [key for key in keys if key not in found]
+
+    def sync(self, store, page_size=500):
+        """
+        Indexes the documents of a NewsStore that aren't in the index yet (e.g. after the index file was
+        deleted, or for articles stored before it existed). Returns how many were added.
+        """
+        added = 0
+        for page in store.iter_pages((), page_size):  # Ids only; texts are fetched for missing ones
+            missing = self.missing_keys(page["ids"])
+            if missing:
+                fetched = store.collection.get(ids=missing, include=["documents"])
+                self.add_many(zip(fetched["ids"], fetched["documents"]))
+                added += len(missing)
+        return added
+
+    def search(self, query, top_k=10, keys=None):
+        """
+        BM25 top-k straight from the posting lists of the query's terms.
+
+        Args:
+        - query (str): The search query.
+        - top_k (int): Number of results.
+        - keys (iterable): Only rank these document ids (None = the whole index).
+
+        Returns:
+        - list: (document id, score) pairs, best first. Documents sharing no term with the query are left out.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+
+        with self.lock:
+            doc_count, total_length = self.db.execute("SELECT doc_count, total_length FROM stats").fetchone()
+            if not doc_count:
+                return []
+            average_length = total_length / doc_count
+
+            key_by_doc = None
+            if keys is not None:
+                key_by_doc = dict(self._select_in("SELECT doc, key FROM docs WHERE key IN ({})", keys))
+                if not key_by_doc:
+                    return []
+                candidates = list(key_by_doc)
+
+            docs, contributions = [], []
+            for term in terms:
+                row = self.db.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if not row:
+                    continue
+                # IDF comes from the whole corpus; only the candidates' postings are read
+                if key_by_doc is None:
+                    rows = self.db.execute(
+                        "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.doc = p.doc WHERE p.term = ?",
+                        (term,)
+                    ).fetchall()
+                else:
+                    rows = self._select_in(
+                        "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.doc = p.doc "
+                        "WHERE p.term = ? AND p.doc IN ({})", candidates, (term,)
+                    )
+                if not rows:
+                    continue
+                postings = np.array(rows, dtype=np.float64)
+                document_frequency = row[0]
+                # Lucene's IDF variant: never negative, even for terms in most of the documents
+                idf = np.log1p((doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                tf, length = postings[:, 1], postings[:, 2]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                docs.append(postings[:, 0].astype(np.int64))
+                contributions.append(idf * tf * (self.k1 + 1) / (tf + norm))
+
+        if not docs:
+            return []
+        docs, doc_positions = np.unique(np.concatenate(docs), return_inverse=True)
+        scores = np.bincount(doc_positions, weights=np.concatenate(contributions), minlength=len(docs))
+
+        if len(docs) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(docs))
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        ranked_docs = [int(doc) for doc in docs[best]]
+        if key_by_doc is None:
+            with self.lock:
+                key_by_doc = dict(self._select_in("SELECT doc, key FROM docs WHERE doc IN ({})", ranked_docs))
+        return [(key_by_doc[doc], float(score)) for doc, score in zip(ranked_docs, scores[best]) if doc in key_by_doc]
+
+    def close(self):
+        self.db.close()
@@ -1,19 +1,24 @@
 import chromadb
+from news_store import NewsStore
 
 # Connect to ChromaDB
 chroma_client = chromadb.PersistentClient(path="./chroma_db")  # Ensure this matches your scraper
-collection = chroma_client.get_or_create_collection("news_articles")
-
-# Fetch metadata instead of IDs
-results = collection.get(include=["metadatas"])
+store = NewsStore.open(chroma_client)
 
 print("🔍 Checking ChromaDB entries...")
 
-if results and "metadatas" in results and results["metadatas"]:
-    print(f"✅ Found {len(results['metadatas'])} entries in ChromaDB.")
+# Count-only query (no metadata is pulled out of the collection)
+total = store.count()
+if total:
+    print(f"✅ Found {total} entries in ChromaDB.")
 else:
     print("❌ No entries found in ChromaDB.")
 
-# Additional check: Count total entries
-print(f"📊 Total entries in ChromaDB: {collection.count()}")
+# Peek at a few entries to check their metadata looks right
+sample = next(store.iter_pages(("metadatas",), page_size=3), None)
+if sample:
+    for article_id, metadata in zip(sample["ids"], sample["metadatas"]):
+        print(f"   • {article_id[:12]}… {metadata.get('title', '')[:80]} ({metadata.get('source', '')})")
 
+# Additional check: Count total entries
+print(f"📊 Total entries in ChromaDB: {total}")
@@ -1,24 +1,145 @@
 import os
-import json
+import queue
+import shutil
 import chromadb
 import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 import re
+from embedding_cache import DEFAULT_EMBEDDING_MODEL, Embedder
+from hash_index import ArticleIndex
+from ingest_manifest import IngestManifest
+from news_archive import is_archive_file, iter_archive_articles
+from near_duplicates import NearDuplicateIndex, minhash_signature
+from news_store import NewsStore
 
 
 # Checks archive of JSON files to ingest files that haven't entered DB.
 # Makes sure there aren't duplicates, checks via distinct URL
 
+# Files that fail to parse are moved here instead of aborting the ingest
+QUARANTINE_DIR = "_quarantine"
+
+FILE_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+_results = None  # Result queue of a parse worker process (set by _init_parse_worker)
+
+
+def prepare_article(article, num_perm=None):
+    """
+    Hashes an article and builds its ChromaDB entry (module-level so it can run in the parse pool).
+
+    Returns (article_hash, metadata, document, signature), or None if the article has no URL.
+    signature is the MinHash of the content when num_perm is given.
+    """
+    normalized_url = JSONToChromaDB.normalize_url(article.get("url"))  # ✅ Normalize URL
+    if not normalized_url:
+        return None
+
+    title = article.get("title", "Unknown title")
+    content = article.get("content", "No content available")
+    # ✅ Unique identifier: the id data_collect.py gave the article (so both tools agree on it in
+    # ChromaDB, the hash index and the near-duplicate index), or our own for archives without one
+    article_hash = article.get("hash") or JSONToChromaDB.generate_article_hash(title, normalized_url, content)
+
+    # ✅ Ensure metadata does not contain None values
+    metadata = {
+        "hash": article_hash,
+        "title": title,
+        "url": normalized_url,
+        "published_date": article.get("published_at", "Unknown date"),
+        "source": article.get("source", "Unknown source"),
+        "author": article.get("author", "Unknown author"),
+        "category": article.get("category", "Unknown category"),
+        "language": article.get("language", "Unknown"),  # ✅ Additional fields
+        "summary": article.get("description", "No summary available")  # ✅ Include description as summary
+    }
+
+    # ✅ Store full document as a combination of content and description
+    full_document = (
+        f"{JSONToChromaDB.clean_text(content)}\n\nSummary: {JSONToChromaDB.clean_text(metadata['summary'])}"
+    )
+    signature = minhash_signature(content, num_perm) if num_perm else None
+    return (article_hash, metadata, full_document, signature)
+
+
+def iter_file_batches(file_path, batch_size=500, num_perm=None, start=0, end=None):
+    """
+    Streams one archive (from byte `start` to `end` for JSONL) and yields messages for the writer:
+    ("batch", path, entries) for every batch_size articles, then ("done", path, info)
+    or ("error", path, message) if the file can't be read.
+    """
+    entries, count = [], 0
+    status = {"truncated": False}
+    try:
+        for article in iter_archive_articles(file_path, start, end, status):
+            prepared = prepare_article(article, num_perm) if isinstance(article, dict) else None
+            if prepared:
+                entries.append(prepared)
+                count += 1
+            if len(entries) >= batch_size:
+                yield ("batch", file_path, entries)
+                entries = []
+    except Exception as e:  # Malformed JSON, broken compression, unexpected structure...
+        yield ("error", file_path, f"{type(e).__name__}: {e}")
+        return
+    if entries:
+        yield ("batch", file_path, entries)
+    yield ("done", file_path, {"articles": count, "end": end, "complete": not status["truncated"]})
+
+
+def _init_parse_worker(results):
+    global _results
+    _results = results
+
+
+def parse_archive_file(file_path, batch_size, num_perm, start, end):
+    """Parse pool task: streams one file's batches into the shared result queue."""
+    for message in iter_file_batches(file_path, batch_size, num_perm, start, end):
+        _results.put(message)  # Blocks while the writer is behind, so memory stays bounded
+
+
 class JSONToChromaDB:
-    def __init__(self, news_dir="NEWS_FILES", chroma_db_path="./chroma_db", load_all=True):
-        """Initialize the JSON to ChromaDB Loader."""
+    def __init__(self, news_dir="NEWS_FILES", chroma_db_path="./chroma_db", load_all=True,
+                 near_duplicate_threshold=0.85, near_duplicate_action="skip", workers=None, batch_size=500,
+                 max_pending_batches=None, use_manifest=True, embedding_model=DEFAULT_EMBEDDING_MODEL,
+                 embedding_batch_size=64):
+        """
+        Initialize the JSON to ChromaDB Loader.
+
+        Args:
+        - use_manifest (bool): Skip files (and parts of append-only files) ingested by earlier runs.
+        - embedding_model (str): Model documents are embedded with ("default" = Chroma's own), None
+          to let Chroma embed them on add() as before.
+        - embedding_batch_size (int): Documents per embedding call (length-sorted).
+        - workers (int): Processes that parse and hash archive files (default: CPU count; 1 = no pool).
+        - batch_size (int): Articles per batch sent to the writer and per ChromaDB add().
+        - max_pending_batches (int): Parsed batches that may wait for the writer (default: 2 per worker).
+        """
         self.news_dir = news_dir
         self.chroma_db_path = chroma_db_path
         self.load_all = load_all  # Toggle to load all files or only today's
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.near_duplicate_action = near_duplicate_action  # "skip", "link" (tag near_duplicate_of) or None
+        self.near_duplicates = None
+        self.near_duplicates_skipped = 0
         self.client = None
         self.collection = None
-        self.existing_hashes = set()  # ✅ Store existing article hashes for fast duplicate checking
+        self.store = None
+        self.index = None
+        self.existing_hashes = set()  # ✅ Existing article hashes (on-disk index shared with data_collect.py)
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches or 2 * self.workers
+        self.quarantined = []
+        self.failed_writes = set()  # Files with a batch that couldn't be added (not marked as ingested)
+        self.use_manifest = use_manifest
+        self.manifest = None
+        self.embedding_model = embedding_model
+        self.embedding_batch_size = embedding_batch_size
+        self.embedder = None
 
         # ✅ Initialize ChromaDB
         self._init_chromadb()
@@ -40,164 +161,284 @@ class JSONToChromaDB:
         except Exception:
             print(f"⚠️ Collection '{collection_name}' not found. Creating a new one...")
             self.collection = self.client.create_collection(collection_name)
+        self.store = NewsStore(self.collection)
 
         # ✅ Load all existing article hashes once at startup
         self._load_existing_hashes()
 
-    def clean_text(self, text):
+        # ✅ Which files (and byte offsets) earlier runs already ingested
+        if self.use_manifest:
+            self.manifest = IngestManifest(os.path.join(self.chroma_db_path, "ingest_manifest.sqlite3"))
+
+        # ✅ Embeddings are computed here (cached by content hash + model) and passed to Chroma
+        if self.embedding_model:
+            self.embedder = Embedder(
+                os.path.join(self.chroma_db_path, "embedding_cache.sqlite3"),
+                model_name=self.embedding_model, batch_size=self.embedding_batch_size
+            )
+
+        # ✅ Near-duplicate index shared with data_collect.py (catches syndicated copies with small edits)
+        if self.near_duplicate_action:
+            self.near_duplicates = NearDuplicateIndex(
+                os.path.join(self.chroma_db_path, "near_duplicates.sqlite3"), threshold=self.near_duplicate_threshold
+            )
+
+    @staticmethod
+    def clean_text(text):
         """Removes excessive whitespace and HTML artifacts from text."""
         text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with single space
         text = text.replace("\n", " ").strip()  # Remove newlines
         return text
 
     def process_article(self, article):
-        """Processes an article and adds it to ChromaDB."""
-        original_url = article.get("url")
-        normalized_url = self.normalize_url(original_url)  # ✅ Normalize URL
-
-        title = article.get("title", "Unknown title")
-        content = article.get("content", "No content available")
-        article_hash = self.generate_article_hash(title, normalized_url, content)  # ✅ Unique identifier
+        """Processes an article and returns its (id, metadata, document) for ChromaDB, or None to skip it."""
+        num_perm = self.near_duplicates.num_perm if self.near_duplicates else None
+        prepared = prepare_article(article, num_perm)
+        return self.accept_entry(prepared, set()) if prepared else None
+
+    def accept_entry(self, prepared, batch_ids):
+        """
+        Writer-side checks for a prepared article: duplicates (stored, or already in this batch)
+        and near-duplicates. Returns the (id, metadata, document) tuple to insert, or None.
+        """
+        article_hash, metadata, full_document, signature = prepared
 
         # ✅ Skip duplicate articles
-        if not normalized_url or article_hash in self.existing_hashes:
+        if article_hash in batch_ids or article_hash in self.existing_hashes:
             return None  # Skip duplicate
 
-        # ✅ Ensure metadata does not contain None values
-        metadata = {
-            "hash": article_hash,
-            "title": title,
-            "url": normalized_url,
-            "published_date": article.get("published_at", "Unknown date"),
-            "source": article.get("source", "Unknown source"),
-            "author": article.get("author", "Unknown author"),
-            "category": article.get("category", "Unknown category"),
-            "language": article.get("language", "Unknown"),  # ✅ Additional fields
-            "summary": article.get("description", "No summary available")  # ✅ Include description as summary
-        }
-
-        # ✅ Store full document as a combination of content and description
-        full_document = f"{self.clean_text(content)}\n\nSummary: {self.clean_text(metadata['summary'])}"
+        # ✅ Skip (or link) syndicated copies of articles we already have
+        if self.near_duplicates and signature:
+            match = self.near_duplicates.query(signature, article_hash)
+            if match and self.near_duplicate_action == "skip":
+                self.near_duplicates_skipped += 1
+                return None
+            if match:
+                metadata["near_duplicate_of"] = match[0]
+            self.near_duplicates.reserve(article_hash, signature)  # Indexed by add_entries once stored
 
         return (article_hash, metadata, full_document)  # ✅ Return tuple for insertion
 
     def _load_existing_hashes(self):
-        """Loads all existing article hashes from ChromaDB into a set for fast lookups."""
-        existing_data = self.collection.get(include=["metadatas"])
-        if existing_data and "metadatas" in existing_data:
-            self.existing_hashes = {meta["hash"] for meta in existing_data.get("metadatas", []) if "hash" in meta}
-            print(f"🔄 Loaded {len(self.existing_hashes)} existing articles from ChromaDB.")
+        """Opens the on-disk hash index (rebuilt from ChromaDB only if it's out of sync) for fast lookups."""
+        self.index = ArticleIndex(os.path.join(self.chroma_db_path, "article_index.sqlite3"))
+        self.index.sync(self.store)
+        self.existing_hashes = self.index.ids
+        print(f"🔄 Loaded {len(self.existing_hashes)} existing articles from the hash index.")
 
     def get_json_files(self, days=1):
-        """Returns JSON files from NEWS_FILES directory based on date range."""
-        all_files = [f for f in os.listdir(self.news_dir) if f.endswith(".json")]
+        """Returns JSON / JSONL archive files from NEWS_FILES directory based on date range."""
+        all_files = [f for f in os.listdir(self.news_dir) if is_archive_file(f)]
 
         if self.load_all:
             print(f"📂 Loading ALL JSON files ({len(all_files)} found).")
             return all_files
 
-        # Filter files based on date range
+        # Filter files based on date range: the date in the file name (news_YYYY-MM-DD-...),
+        # or the modification time for files named otherwise
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        date_strings = [cutoff_date.strftime("%Y-%m-%d") for i in range(days)]
-
-        filtered_files = [f for f in all_files if any(date in f for date in date_strings)]
+        filtered_files = []
+        for f in all_files:
+            match = FILE_DATE.search(f)
+            if match:
+                recent = match.group(1) >= cutoff_date.strftime("%Y-%m-%d")
+            else:
+                recent = datetime.utcfromtimestamp(os.path.getmtime(os.path.join(self.news_dir, f))) >= cutoff_date
+            if recent:
+                filtered_files.append(f)
         print(f"📂 Loading JSON files from the last {days} days ({len(filtered_files)} found).")
 
         return filtered_files
 
 
-    def normalize_url(self, url):
+    @staticmethod
+    def normalize_url(url):
         """Normalize a URL for consistent duplicate checking."""
         if not url:
             return None
         parsed_url = urlparse(url)
         return parsed_url.scheme + "://" + parsed_url.netloc + parsed_url.path  # ✅ Remove query params, standardize format
 
-    def generate_article_hash(self, title, url, content):
+    @staticmethod
+    def generate_article_hash(title, url, content):
         """Generate a unique hash for each article using its title, URL, and content."""
         raw_string = f"{title}{url}{content}"
         return hashlib.sha256(raw_string.encode()).hexdigest()
 
-    def load_json_to_chromadb(self):
-        """Loads JSON articles into ChromaDB without duplicates (matching by unique article hash)."""
-        json_files = self.get_json_files()
+    def quarantine(self, file_path, reason):
+        """Moves a file that can't be parsed out of the way, so later runs don't trip on it again."""
+        quarantine_dir = os.path.join(self.news_dir, QUARANTINE_DIR)
+        os.makedirs(quarantine_dir, exist_ok=True)
+        destination = os.path.join(quarantine_dir, os.path.basename(file_path))
+        try:
+            shutil.move(file_path, destination)
+            print(f"🚧 Quarantined {os.path.basename(file_path)} ({reason}) -> {destination}")
+        except OSError as e:
+            print(f"❌ Could not quarantine {file_path} ({reason}): {e}")
+        self.quarantined.append(os.path.basename(file_path))
+        if self.manifest:
+            self.manifest.forget(file_path)
+
+    def add_entries(self, file_path, entries):
+        """Writes one batch of prepared articles to ChromaDB and the hash index. Returns the number added."""
+        batch_ids = set()
+        new_entries = []  # Stores (id, metadata, document) tuples
+        for prepared in entries:
+            accepted = self.accept_entry(prepared, batch_ids)
+            if accepted:
+                new_entries.append(accepted)
+                batch_ids.add(accepted[0])
+        if not new_entries:
+            return 0
+
+        stored = False
+        try:
+            # Stored by another tool since the index was built: record them instead of embedding them again
+            already_stored = self.store.existing_ids(batch_ids)
+            if already_stored:
+                self.index.add_articles(
+                    list(already_stored), [metadata for i, metadata, _ in new_entries if i in already_stored]
+                )
+                new_entries = [entry for entry in new_entries if entry[0] not in already_stored]
+                if not new_entries:
+                    stored = True
+                    return 0
+
+            filtered_ids, filtered_metadatas, filtered_documents = zip(*new_entries)
+            embeddings = self.embedder.embed(list(filtered_documents)) if self.embedder else None
+            self.collection.add(
+                ids=list(filtered_ids),
+                documents=list(filtered_documents),
+                metadatas=list(filtered_metadatas),
+                embeddings=embeddings,
+            )
+            stored = True
+        except Exception as e:
+            print(f"❌ Error adding articles from {os.path.basename(file_path)} to ChromaDB: {e}")
+            self.failed_writes.add(file_path)
+            return 0
+        finally:
+            # Near-duplicate signatures only enter the index with their articles, so a failed
+            # file can be retried without its articles matching themselves
+            if self.near_duplicates:
+                if stored:
+                    self.near_duplicates.confirm(batch_ids)
+                else:
+                    self.near_duplicates.release(batch_ids)
+        self.index.add_articles(filtered_ids, filtered_metadatas)  # ✅ Update existing hashes
+        return len(filtered_ids)
+
+    def iter_parse_results(self, plans):
+        """
+        Parses and hashes files in a process pool and yields their messages (see iter_file_batches)
+        as they arrive. With a single worker, files are parsed inline instead.
+
+        Args:
+        - plans (list): (file_path, start, end) byte ranges to read.
+        """
+        num_perm = self.near_duplicates.num_perm if self.near_duplicates else None
+        file_paths = [file_path for file_path, _, _ in plans]
+        if self.workers <= 1 or len(plans) == 1:
+            for file_path, start, end in plans:
+                yield from iter_file_batches(file_path, self.batch_size, num_perm, start, end)
+            return
+
+        manager = multiprocessing.Manager()
+        results = manager.Queue(maxsize=self.max_pending_batches)  # Backpressure on the parsers
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_parse_worker, initargs=(results,))
+        try:
+            futures = {
+                pool.submit(parse_archive_file, file_path, self.batch_size, num_perm, start, end): file_path
+                for file_path, start, end in plans
+            }
+            remaining = set(file_paths)
+            while remaining:
+                try:
+                    message = results.get(timeout=1)
+                except queue.Empty:
+                    # A worker that died without reporting would otherwise leave us waiting forever
+                    for future, file_path in futures.items():
+                        if file_path in remaining and future.done() and future.exception():
+                            remaining.discard(file_path)
+                            yield ("error", file_path, f"parse worker failed: {future.exception()}")
+                    continue
+                if message[0] != "batch":
+                    remaining.discard(message[1])
+                yield message
+        finally:
+            manager.shutdown()  # Unblocks workers still waiting on a full queue if we stopped early
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def load_json_to_chromadb(self, days=1):
+        """
+        Loads JSON articles into ChromaDB without duplicates (matching by unique article hash).
+
+        Only data the manifest hasn't seen is read: new files, and the appended tail of JSONL
+        archives. Files are streamed, parsed and hashed by a pool of worker processes; this process
+        is the only writer. A file that can't be parsed is quarantined and the ingest carries on.
+        """
+        json_files = self.get_json_files(days)
         if not json_files:
             print("⚠️ No JSON files found. Exiting.")
             return
 
-        # ✅ Track added articles count
-        added_count = 0
-        total_before = len(self.existing_hashes)  # Count before loading
-
-        # ✅ Process each JSON file
+        plans = []  # (file_path, start, end)
+        unchanged = 0
         for file in json_files:
             file_path = os.path.join(self.news_dir, file)
-
             # ✅ Skip empty files before opening
             if os.stat(file_path).st_size == 0:
                 print(f"⚠️ Skipping empty file: {file}")
                 continue  # Move to the next file
-
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    try:
-                        data = json.load(f)  # Load entire JSON file as an object
-                        if isinstance(data, list):  
-                            articles = data  # If it's a list, assign directly
-                        elif isinstance(data, dict) and "articles" in data:  
-                            articles = data["articles"]  # If wrapped in an "articles" key
-                        else:
-                            print(f"⚠️ Unexpected JSON structure in {file}")
-                            return
-                    except json.JSONDecodeError as e:
-                        print(f"❌ Error parsing JSON in {file}: {e}")
-                        return
-
-
-            except Exception as e:
-                print(f"❌ Error loading {file}: {e}")
+            byte_range = self.manifest.plan(file_path) if self.manifest else (0, os.stat(file_path).st_size)
+            if byte_range is None:
+                unchanged += 1
                 continue
+            if byte_range[0]:
+                print(f"➕ {file} grew since the last ingest, reading from byte {byte_range[0]}.")
+            plans.append((file_path, *byte_range))
+
+        if unchanged:
+            print(f"⏭️ Skipping {unchanged} files already ingested.")
+        if not plans:
+            print("✅ Nothing new to ingest.")
+            return
 
-            # ✅ Batch Process Articles
-            new_entries = []  # Stores (id, metadata, document) tuples
-            
-            for article in articles:
-                processed = self.process_article(article)  # Use the function
-
-                if processed:  # If the function returned a valid tuple, add it
-                    new_entries.append(processed)
-
-
-            # ✅ Store articles in ChromaDB in batch
-            if new_entries:  # Check if there are any articles to add
-                try:
-                    # ✅ Ensure safe unpacking (won't crash if empty)
-                    filtered_ids, filtered_metadatas, filtered_documents = zip(*new_entries) if new_entries else ([], [], [])
-
-                    # ✅ Ensure the lists have consistent lengths before adding to DB
-                    if len(filtered_ids) == len(filtered_metadatas) == len(filtered_documents):
-                        self.collection.add(
-                            ids=list(filtered_ids),
-                            documents=list(filtered_documents),
-                            metadatas=list(filtered_metadatas),
-                        )
-                        print(f"✅ Successfully added {len(filtered_ids)} articles from {file}.")
-
-                        self.existing_hashes.update(filtered_ids)  # ✅ Update existing hashes
-                        added_count += len(filtered_ids)
-                    else:
-                        print(f"❌ Length mismatch detected! Skipping batch from {file}.")
-
-                except Exception as e:
-                    print(f"❌ Error adding articles to ChromaDB: {e}")
+        # ✅ Track added articles count
+        added_count = 0
+        added_per_file = {}
+        print(f"⚙️ Parsing {len(plans)} files with {min(self.workers, len(plans))} worker(s)...")
+
+        for kind, file_path, payload in self.iter_parse_results(plans):
+            file = os.path.basename(file_path)
+            if kind == "batch":
+                # ✅ Store articles in ChromaDB in batch
+                added = self.add_entries(file_path, payload)
+                added_per_file[file] = added_per_file.get(file, 0) + added
+                added_count += added
+            elif kind == "error":
+                print(f"❌ Error loading {file}: {payload}")
+                self.quarantine(file_path, payload)
             else:
-                print(f"⚠️ No new articles to add from {file}. Skipping.")
-
-            total_after = len(self.existing_hashes)  # Count after loading
-
-            print(f"\n🎉 Finished loading articles into ChromaDB.")
-            print(f"📊 New articles added: {added_count}")
-            print(f"📚 Total articles in ChromaDB: {total_after}")
+                if added_per_file.get(file):
+                    print(f"✅ Successfully added {added_per_file[file]} articles from {file}.")
+                else:
+                    print(f"⚠️ No new articles to add from {file}. Skipping.")
+                # Every batch of the file is in ChromaDB: next run starts after it
+                if self.manifest and payload["complete"] and file_path not in self.failed_writes:
+                    self.manifest.record(file_path, payload["end"], added_per_file.get(file, 0))
+
+        total_after = len(self.existing_hashes)  # Count after loading
+
+        print(f"\n🎉 Finished loading articles into ChromaDB.")
+        print(f"📊 New articles added: {added_count}")
+        if self.near_duplicates_skipped:
+            print(f"🧬 Near-duplicates skipped: {self.near_duplicates_skipped}")
+        if self.embedder:
+            print(f"🧠 Embeddings: {self.embedder.stats['embedded']} computed, {self.embedder.stats['cached']} from cache")
+        if self.quarantined:
+            print(f"🚧 Quarantined files: {len(self.quarantined)} (see {os.path.join(self.news_dir, QUARANTINE_DIR)})")
+        print(f"📚 Total articles in ChromaDB: {total_after}")
 
 
 
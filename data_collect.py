@@ -1,22 +1,45 @@
 import os
 import json
+import codecs
 import asyncio
 import aiohttp
 import hashlib
 import unicodedata
 import random
 import re
+import time
+import argparse
 import traceback
-from datetime import datetime, timedelta
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import chromadb
 from fake_useragent import UserAgent
 from newspaper import Article
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from unstructured.partition.html import partition_html
 from playwright.async_api import async_playwright
 import brotli  # ✅ Import Brotli for manual decompression if needed
+from article_cache import ArticleCache
+from domain_strategy import DomainStrategy
+from hash_index import ArticleIndex, normalize_url
+from news_archive import NewsArchiveWriter
+from near_duplicates import NearDuplicateIndex, minhash_signature
+from news_store import NewsStore
+from scraper_metrics import ScraperMetrics
+from shard_ledger import SpoolWriter, shard_for
+
+# ⚡ lxml is a much faster BeautifulSoup backend; fall back to the stdlib parser if it's missing
+try:
+    import lxml  # noqa: F401
+    DEFAULT_HTML_PARSER = "lxml"
+except ImportError:
+    DEFAULT_HTML_PARSER = "html.parser"
 
 
 # Load API key from .env file
@@ -27,26 +50,249 @@ API_KEY = os.getenv("API_KEY")
 NEWS_DIR = "NEWS_FILES"
 os.makedirs(NEWS_DIR, exist_ok=True)
 
+# Directory for scraper state that persists between runs
+STATE_DIR = "scraper_state"
+
 BASE_URL = "http://api.mediastack.com/v1/news"
 
+# Indexes shared with chroma_ingest.py live next to the ChromaDB files
+INDEX_DIR = "chroma_db"
+
+# Compact index of stored article hashes/URLs
+HASH_INDEX_PATH = os.path.join(INDEX_DIR, "article_index.sqlite3")
+
+# MinHash LSH index of article content
+NEAR_DUPLICATE_INDEX_PATH = os.path.join(INDEX_DIR, "near_duplicates.sqlite3")
+
+# Article pages are downloaded in chunks; anything that isn't HTML is dropped before its body is read
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+
+
+# HTML parsing is CPU-bound, so these run in a process pool (module-level so they can be pickled)
+def extract_paragraph_text(html, parser=DEFAULT_HTML_PARSER):
+    """Parses only the <p> tags of a page and returns their joined text."""
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer("p"))
+    return "\n".join([p.get_text() for p in soup.find_all("p")])
+
+
+def extract_unstructured_text(html):
+    """Extracts text elements with Unstructured and returns them joined."""
+    text_elements = partition_html(text=html)
+    return " ".join([elem.text for elem in text_elements if elem.text.strip()])
+
+
+def extract_newspaper_text(url, html):
+    """Runs Newspaper3k's article extraction on HTML we already have (no second download)."""
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+
+class ParagraphCollector(HTMLParser):
+    """Counts <p> text in HTML fed chunk by chunk, so a download can stop once the article is in."""
+
+    BLOCK_TAGS = {"p", "div", "article", "section", "main", "body", "ul", "ol", "table", "footer"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_paragraph = False
+        self.chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "p":
+            self.in_paragraph = True
+        elif tag in self.BLOCK_TAGS:
+            self.in_paragraph = False  # <p> closed implicitly
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self.in_paragraph = False
+
+    def handle_data(self, data):
+        if self.in_paragraph:
+            self.chars += len(data.strip())
+
+
+# Resource types Playwright never needs to render article text
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+
+class TokenBucket:
+    """Async token bucket: allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = None  # Created lazily inside the running event loop
+
+    async def acquire(self):
+        """Waits until a request may be sent."""
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Blocks all requests for `seconds` (used for 429 / Retry-After) and drops any saved-up burst."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class BrowserContextPool:
+    """
+    Fixed-size pool of reusable Playwright browser contexts.
+
+    Each context blocks images/media/fonts and third-party scripts, and is recycled
+    after `max_uses` pages so long runs don't let Chromium memory grow unbounded.
+    """
+
+    def __init__(self, browser, size=4, max_uses=25):
+        self.browser = browser
+        self.size = size
+        self.max_uses = max_uses
+        self.contexts = asyncio.Queue()
+        self.context_state = {}  # context -> {"uses": int, "host": str}
+
+    async def start(self):
+        """Creates all contexts up front so the pool size is fixed."""
+        for _ in range(self.size):
+            await self.contexts.put(await self._new_context())
+
+    async def _new_context(self):
+        context = await self.browser.new_context(user_agent=NewsScraper.safe_user_agent())
+        self.context_state[context] = {"uses": 0, "host": ""}
+
+        async def block_unneeded(route):
+            request = route.request
+            if request.resource_type in BLOCKED_RESOURCE_TYPES:
+                return await route.abort()
+            if request.resource_type == "script":
+                page_host = self.context_state.get(context, {}).get("host", "")
+                if page_host and not self.is_same_site(NewsScraper.get_domain(request.url), page_host):
+                    return await route.abort()  # Third-party script (ads, trackers, widgets)
+            return await route.continue_()
+
+        await context.route("**/*", block_unneeded)
+        return context
+
+    @staticmethod
+    def is_same_site(host, page_host):
+        """Treats subdomains of the page's registrable domain as first-party (e.g. cdn.cnn.com for cnn.com)."""
+        site = ".".join(page_host.split(".")[-2:])
+        return host == site or host.endswith("." + site)
+
+    async def _recycle(self, context):
+        """Closes a worn-out context and replaces it with a fresh one."""
+        self.context_state.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            print(f"⚠️ Error closing browser context: {e}")
+        return await self._new_context()
+
+    async def fetch(self, url, timeout=10000):
+        """Renders a page in a pooled context and returns its HTML once the DOM is ready."""
+        context = await self.contexts.get()
+        try:
+            if context not in self.context_state:  # Slot left empty by a failed recycle
+                context = await self._new_context()
+            state = self.context_state[context]
+            if state["uses"] >= self.max_uses:
+                context = await self._recycle(context)
+                state = self.context_state[context]
+            state["uses"] += 1
+            state["host"] = NewsScraper.get_domain(url)
+
+            page = await context.new_page()
+            try:
+                await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+                return await page.content()
+            finally:
+                await page.close()
+        finally:
+            if context is not None and context not in self.context_state:
+                # The recycle closed this context but couldn't open its replacement: try once more,
+                # and otherwise leave an empty slot for the next fetch to fill
+                try:
+                    context = await self._new_context()
+                except Exception as e:
+                    print(f"⚠️ Error replacing browser context: {e}")
+                    context = None
+            await self.contexts.put(context)
+
+    async def close(self):
+        """Closes every context in the pool."""
+        while not self.contexts.empty():
+            context = self.contexts.get_nowait()
+            if context is None:
+                continue
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"⚠️ Error closing browser context: {e}")
+        self.context_state.clear()
+
 
 class NewsDatabase:
-    def __init__(self, db_client):
+    def __init__(self, db_client, index_path=HASH_INDEX_PATH):
+        """
+        Args:
+        - db_client: ChromaDB client. None opens only the hash index (sharded workers, whose
+          batches are committed by the coordinator).
+        - index_path (str): SQLite hash index of the stored articles.
+        """
         self.news_collection = db_client.get_or_create_collection(
             name="news_articles",
             metadata={"hnsw:space": "cosine"}  # Ensure proper vector search settings
-        )
+        ) if db_client is not None else None
+        self.store = NewsStore(self.news_collection) if self.news_collection is not None else None
         self.articles_batch = []
         self.total_articles_saved = 0
 
-        # ✅ Load existing article IDs ONCE at startup
-        existing_data = self.news_collection.get(include=["metadatas"])  # Fetch metadata instead of "ids"
+        # ✅ Existing article IDs / normalized URLs live in an on-disk index instead of being
+        # pulled out of ChromaDB at every startup (only rebuilt if it's out of sync)
+        self.index = ArticleIndex(index_path)
+        if self.store:
+            self.index.sync(self.store)
+        self.existing_ids = self.index.ids
+        self.existing_urls = self.index.urls
 
-        # Extract existing IDs from metadata if they exist
-        if existing_data and "metadatas" in existing_data:
-            self.existing_ids = set(article["hash"] for article in existing_data["metadatas"] if "hash" in article)
-        else:
-            self.existing_ids = set()
+    def is_known(self, article_hash, normalized_url):
+        """Returns the reason an article is already stored ("duplicate_hash" / "duplicate_url"), or None."""
+        if article_hash in self.existing_ids:
+            return "duplicate_hash"
+        if normalized_url and normalized_url in self.existing_urls:
+            return "duplicate_url"
+        return None
 
 
 
@@ -73,34 +319,58 @@ class NewsDatabase:
             print("⚠️ No articles to save.")
             return  # No articles to save
 
+        if self.commit_batch(self.articles_batch):
+            # Clear batch for the next call
+            self.articles_batch = []
+
+    @staticmethod
+    def article_document(article):
+        """The text stored (and embedded) for an article: its content plus the description, as chroma_ingest.py builds it."""
+        content = " ".join((article.get("content") or "").split())
+        summary = " ".join((article.get("description") or "").split())
+        return f"{content}\n\nSummary: {summary}"
+
+    def commit_batch(self, articles):
+        """Writes one batch of articles to ChromaDB. Returns False if the write failed."""
         try:
-            print(f"🛠️ Preparing to send {len(self.articles_batch)} articles to ChromaDB...")
+            print(f"🛠️ Preparing to send {len(articles)} articles to ChromaDB...")
 
             # Ensure only unique IDs
-            unique_articles = {article["hash"]: article for article in self.articles_batch}.values()
+            unique_articles = {article["hash"]: article for article in articles}.values()
             valid_ids = [article["hash"] for article in unique_articles]
 
+            # Articles another tool stored since our index was built: just record them in the index
+            already_stored = self.store.existing_ids(valid_ids)
+            if already_stored:
+                print(f"🚫 {len(already_stored)} articles already in ChromaDB, skipping them.")
+                self.index.add_articles(
+                    list(already_stored), [a for a in unique_articles if a["hash"] in already_stored]
+                )
+                unique_articles = [a for a in unique_articles if a["hash"] not in already_stored]
+                valid_ids = [article["hash"] for article in unique_articles]
+
             if not valid_ids:
                 print("⚠️ No valid unique IDs found, skipping ChromaDB commit.")
-                return  # Prevent sending an empty list
+                return True  # Prevent sending an empty list
 
             print(f"🔄 Final Articles to Save: {len(valid_ids)}")
             print(f"📜 Sample Article: {valid_ids[0]}")
 
             self.news_collection.add(
                 ids=valid_ids,
+                documents=[self.article_document(article) for article in unique_articles],
                 metadatas=list(unique_articles)
             )
             print(f"🗂️ ChromaDB updated: {len(unique_articles)} new unique articles added.")
 
-            # Update existing_ids set
-            self.existing_ids.update(valid_ids)
-
-            # Clear batch for the next call
-            self.articles_batch = []
+            # Update the on-disk hash index (existing_ids / existing_urls)
+            self.index.add_articles(valid_ids, unique_articles)
+            self.total_articles_saved += len(valid_ids)
+            return True
 
         except Exception as e:
             print(f"⚠️ Error saving batch to ChromaDB: {e}")
+            return False
 
 
 
@@ -108,18 +378,111 @@ class NewsDatabase:
 
 
 class NewsScraper:
-    def __init__(self, api_key=None, max_articles=250, max_api_calls=5, time_filter="last_month", save_json=True):
+    def __init__(self, api_key=None, max_articles=250, max_api_calls=5, time_filter="last_month", save_json=True,
+                 max_concurrency=20, per_domain_concurrency=2, max_per_source=5,
+                 browser_pool_size=4, browser_context_max_uses=25,
+                 parse_workers=None, html_parser=DEFAULT_HTML_PARSER, newspaper_refetch=False,
+                 use_cache=True, cache_dir="scrape_cache", cache_ttl=7 * 24 * 3600, cache_max_mb=1024,
+                 adaptive_extraction=True, archive_compression=None, archive_rotation="hour",
+                 flush_every=50, flush_interval=60, max_pending_commits=2,
+                 near_duplicate_threshold=0.85, near_duplicate_action="skip",
+                 api_calls_per_minute=4, api_burst=1, prefetch_pages=2, api_max_retries=3,
+                 metrics_port=None, chroma_client=None, base_url=BASE_URL, news_dir=NEWS_DIR, state_dir=STATE_DIR,
+                 index_dir=INDEX_DIR, max_page_mb=5, early_stop_chars=None,
+                 shard_index=0, shard_count=1, shard_by="offset", ledger=None, spool_dir=None, checkpoint=True):
         self.api_key = api_key or API_KEY
-        self.database = NewsDatabase(db_client)
+        self.base_url = base_url
+        self.state_dir = state_dir
+        self.database = NewsDatabase(
+            None if spool_dir else (chroma_client or db_client),
+            index_path=os.path.join(index_dir, os.path.basename(HASH_INDEX_PATH))
+        )
         self.max_articles = max_articles
         self.max_api_calls = max_api_calls
         self.time_filter = time_filter
         self.save_json = save_json
+        self.archive = NewsArchiveWriter(news_dir, compression=archive_compression, rotation=archive_rotation)
+
+        # 💾 Incremental commits: flush every N articles or T seconds, in the background
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_pending_commits = max_pending_commits
+        self.commit_queue = None  # Bounded, so the scraper waits when ChromaDB falls behind
+        self.commit_worker = None
+        self.last_flush = time.monotonic()
+        self.uncommitted = {}  # id(batch) -> batch handed to the commit worker but not written yet
+        self.archived_uncommitted = set()  # Hashes of articles archived whose ChromaDB commit hasn't succeeded yet
+
+        # 💾 Crash recovery: after every API page, progress and uncommitted articles are checkpointed
+        self.checkpoint_path = os.path.join(state_dir, "checkpoint.json") if checkpoint else None
+        # Batches ChromaDB kept rejecting are appended here (one JSON line each) instead of staying in memory
+        self.failed_batches_path = os.path.join(state_dir, "failed_batches.jsonl")
+        self.next_call = 0
+
+        # 🔀 Sharded mode (scrape_shards.py): this worker takes every shard_count-th API page
+        # ("offset") or the domains hashed to it ("domain"), claims articles in the shared ledger,
+        # and spools its batches for the coordinator instead of writing to ChromaDB
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.shard_by = shard_by
+        self.ledger = ledger
+        self.spool = SpoolWriter(spool_dir, shard_index) if spool_dir else None
+
+        # 🧬 Near-duplicate (syndicated copy) detection: "skip" drops them, "link" keeps them tagged
+        # with `near_duplicate_of`, None disables the check
+        self.near_duplicate_action = near_duplicate_action
+        self.near_duplicates = (
+            NearDuplicateIndex(
+                os.path.join(index_dir, os.path.basename(NEAR_DUPLICATE_INDEX_PATH)), threshold=near_duplicate_threshold
+            )
+            if near_duplicate_action else None
+        )
         self.browser = None  # 🔴 Store a persistent browser instance
+        self.browser_pool = None  # Reusable browser contexts for JS-rendered pages
+        self.browser_pool_size = browser_pool_size
+        self.browser_context_max_uses = browser_context_max_uses
         self.articles_fetched = 0
         self.source_count = defaultdict(int)
         self.duplicate_hashes = set()
-        self.wait_time = 15  # Default wait time
+        self.seen_urls = set()  # Normalized URLs already handled this run
+        self.skip_counts = defaultdict(int)  # Why articles were skipped before any network work
+
+        # 🪣 mediastack rate limit: token bucket (default 4/min = one call every 15s) plus page prefetching
+        self.api_limiter = TokenBucket(api_calls_per_minute / 60, capacity=api_burst)
+        self.prefetch_pages = prefetch_pages
+        self.api_max_retries = api_max_retries
+
+        # 📈 Per-stage latency histograms and outcome counters (Prometheus text + JSON run summary)
+        self.metrics = ScraperMetrics()
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+
+        # ⚡ Concurrent extraction limits (global cap + per-domain cap to stay polite with each site)
+        self.max_concurrency = max_concurrency
+        self.per_domain_concurrency = per_domain_concurrency
+        self.max_per_source = max_per_source
+        self.extract_semaphore = None  # Created lazily inside the running event loop
+        self.domain_semaphores = {}
+        self.browser_start_lock = asyncio.Lock()
+
+        # 🧮 Process pool for HTML parsing so large pages don't stall the event loop
+        self.parse_workers = parse_workers or os.cpu_count()
+        self.html_parser = html_parser
+        self.parse_pool = None
+        self.newspaper_refetch = newspaper_refetch  # Re-download for Newspaper3k only if parsing our HTML fails
+
+        # 📦 Streaming downloads: bodies are capped at max_page_mb, and with early_stop_chars set the
+        # download stops as soon as that much paragraph text has arrived
+        self.max_page_bytes = int(max_page_mb * 1024 ** 2)
+        self.early_stop_chars = early_stop_chars
+
+        # ♻️ On-disk cache of fetched HTML + extracted text, revalidated with ETag/Last-Modified
+        self.cache = ArticleCache(cache_dir, ttl=cache_ttl, max_bytes=cache_max_mb * 1024 ** 2) if use_cache else None
+
+        # 🧭 Learns per domain which extraction method works, so each article starts with it
+        self.strategy = DomainStrategy(
+            os.path.join(state_dir, "domain_strategy.json"), adaptive=adaptive_extraction
+        )
 
         # ✅ Move the API key check to the start
         if not self.api_key:
@@ -143,11 +506,20 @@ class NewsScraper:
             self.playwright = await async_playwright().start()
         if self.browser is None:
             self.browser = await self.playwright.chromium.launch(headless=True)
+        if self.browser_pool is None:
+            self.browser_pool = BrowserContextPool(
+                self.browser, size=self.browser_pool_size, max_uses=self.browser_context_max_uses
+            )
+            await self.browser_pool.start()
         print("🌐 Playwright browser started.")
 
 
     async def close_browser(self):
         """Safely closes Playwright browser instance without crashing."""
+        if self.browser_pool:
+            await self.browser_pool.close()
+            self.browser_pool = None
+
         if self.browser:
             try:
                 await self.browser.close()
@@ -174,6 +546,146 @@ class NewsScraper:
 
 
 
+    async def run_parser(self, func, *args):
+        """Runs a CPU-bound parsing function in the process pool and returns its result."""
+        if self.parse_pool is None:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_pool, func, *args)
+
+    def close_parse_pool(self):
+        """Shuts down the parsing worker processes."""
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown(wait=True)
+            self.parse_pool = None
+            print("🧮 Parser pool shut down.")
+
+    def write_batch(self, articles, retries=3, delay=2):
+        """Archives (if enabled) and commits one batch, retrying ChromaDB with exponential backoff."""
+        if self.spool:
+            print(f"📤 Spooled {len(articles)} articles for the coordinator: {self.spool.write(articles)}")
+            self.metrics.inc("spooled_articles_total", len(articles))
+            self.confirm_signatures(articles, True)
+            return True
+        if self.save_json:
+            # A batch retried after --resume was already archived by the run that first tried it
+            to_archive = [article for article in articles if article["hash"] not in self.archived_uncommitted]
+            if to_archive:
+                print(f"📄 JSON saved: {self.archive.append(to_archive)}")
+                self.archived_uncommitted.update(article["hash"] for article in to_archive)
+        for attempt in range(retries):
+            with self.metrics.timer("stage_seconds", stage="chroma_commit"):
+                committed = self.database.commit_batch(articles)
+            if committed:
+                self.metrics.inc("committed_articles_total", len(articles))
+                self.archived_uncommitted.difference_update(article["hash"] for article in articles)
+                self.confirm_signatures(articles, True)
+                return True
+            self.metrics.inc("commit_failures_total")
+            if attempt < retries - 1:  # No point waiting after the last attempt
+                time.sleep(delay * (2 ** attempt))
+        print(f"❌ Critical: Giving up on batch of {len(articles)} articles after {retries} failed commits.")
+        self.confirm_signatures(articles, False)
+        return False
+
+    def confirm_signatures(self, articles, stored):
+        """Indexes the near-duplicate signatures of a stored batch, or forgets them if the write failed."""
+        if self.near_duplicates:
+            hashes = [article["hash"] for article in articles]
+            if stored:
+                self.near_duplicates.confirm(hashes)
+            else:
+                self.near_duplicates.release(hashes)
+
+    async def run_commit_worker(self):
+        """Background task: commits queued batches off the event loop until it receives None."""
+        while True:
+            batch = await self.commit_queue.get()
+            try:
+                if batch is None:
+                    return
+                if not await asyncio.to_thread(self.write_batch, batch):
+                    await asyncio.to_thread(self.spill_batch, batch)
+                self.uncommitted.pop(id(batch), None)
+            except Exception as e:
+                print(f"⚠️ Commit worker error (batch of {len(batch)} articles not saved): {e}")
+                self.confirm_signatures(batch, False)
+            finally:
+                self.commit_queue.task_done()
+
+    def spill_batch(self, articles):
+        """Moves a batch that couldn't be committed out of memory into the failed-batches file (retried by --resume)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        hashes = [article["hash"] for article in articles]
+        # Whether each article is already in NEWS_FILES travels with the batch, not in every checkpoint
+        record = {"articles": articles, "archived": [h for h in hashes if h in self.archived_uncommitted]}
+        with open(self.failed_batches_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.archived_uncommitted.difference_update(hashes)
+        self.metrics.inc("spilled_articles_total", len(articles))
+        print(f"💾 Saved {len(articles)} uncommitted articles to {self.failed_batches_path} (retried by --resume).")
+
+    def load_failed_batches(self):
+        """
+        Takes over the spilled batches for a resumed run and returns their articles (a torn last line
+        from a crash is skipped), marking those already archived. The file is set aside as `.resumed` until the next checkpoint holds
+        its articles, so batches that fail again during this run start a fresh file.
+        """
+        resumed_path = f"{self.failed_batches_path}.resumed"
+        if os.path.exists(self.failed_batches_path):
+            if os.path.exists(resumed_path):  # An earlier resume crashed before its first checkpoint
+                with open(self.failed_batches_path, "rb") as src, open(resumed_path, "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.failed_batches_path)
+            else:
+                os.replace(self.failed_batches_path, resumed_path)
+
+        articles = []
+        if not os.path.exists(resumed_path):
+            return articles
+        with open(resumed_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping unreadable line in {resumed_path}")
+                    continue
+                articles.extend(record["articles"])
+                self.archived_uncommitted.update(record["archived"])
+        return articles
+
+    async def start_commit_worker(self):
+        self.commit_queue = asyncio.Queue(maxsize=self.max_pending_commits)
+        self.commit_worker = asyncio.create_task(self.run_commit_worker())
+        self.last_flush = time.monotonic()
+
+    async def stop_commit_worker(self):
+        """Flushes what's left and waits for every queued batch to be committed."""
+        await self.flush_batch(force=True)
+        await self.commit_queue.put(None)
+        await self.commit_worker
+        self.commit_worker = None
+
+    async def flush_batch(self, force=False):
+        """Hands the buffered articles to the commit worker once the size or time threshold is reached."""
+        batch = self.database.articles_batch
+        due = len(batch) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval
+        if not batch or not (force or due):
+            return
+
+        self.database.articles_batch = []
+        self.last_flush = time.monotonic()
+        # At most flush_every articles per batch (a resumed run may start with many buffered)
+        chunks = [batch[i:i + self.flush_every] for i in range(0, len(batch), self.flush_every)]
+        for chunk in chunks:
+            self.uncommitted[id(chunk)] = chunk  # Checkpointed from here on, even while waiting below
+        for chunk in chunks:
+            if self.commit_queue.full():
+                print("⏳ ChromaDB is behind, waiting for a pending commit before scraping more...")
+            await self.commit_queue.put(chunk)  # Backpressure: blocks while max_pending_commits are queued
+
     def scrape_article(self, article_data):
         """Scrapes an article and saves it to buffer."""
         self.database.buffer_article(article_data)
@@ -216,6 +728,11 @@ class NewsScraper:
         """Generates a hash to check for duplicates before full text extraction."""
         return hashlib.sha256(f"{title}{description}".encode()).hexdigest()
 
+    @staticmethod
+    def normalize_url(url):
+        """Normalizes a URL (no query string or fragment, lowercase host) for cache keys and duplicate checks."""
+        return normalize_url(url)
+
     @staticmethod
     def clean_text(text):
         """Cleans up extracted text for better readability."""
@@ -227,29 +744,12 @@ class NewsScraper:
         return text.strip()
 
     def save_all_articles_to_json(self):
-        """Saves all collected articles to a single JSON file at the end of an API call."""
+        """Appends all collected articles to the current compressed JSONL archive at the end of an API call."""
         if not self.database.articles_batch:  # ✅ Corrected reference to articles_batch
             return  # No articles to save
 
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H-%M")
-        json_path = os.path.join(NEWS_DIR, f"news_{timestamp}.json")
-
-        # Load existing data if file exists
-        if os.path.exists(json_path):
-            with open(json_path, "r", encoding="utf-8") as f:
-                try:
-                    existing_data = json.load(f)
-                except json.JSONDecodeError:
-                    existing_data = []
-        else:
-            existing_data = []
-
-        # ✅ Append new articles correctly
-        existing_data.extend(self.database.articles_batch)
-
-        # Save back to JSON
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=4)
+        # ✅ Append-only: only this batch is encoded and written, existing data is never re-read
+        json_path = self.archive.append(self.database.articles_batch)
 
         print(f"📄 JSON saved: {json_path}")
 
@@ -259,190 +759,600 @@ class NewsScraper:
     
 
     async def fetch_js_page(self, url):
-        """Fetches page content using a persistent Playwright browser session."""
-        if self.browser is None:
-            await self.start_browser()  # Ensure the browser is started before use
+        """Fetches page content using a pooled Playwright browser context."""
+        if self.browser_pool is None:
+            async with self.browser_start_lock:
+                if self.browser_pool is None:
+                    await self.start_browser()  # Ensure the browser is started before use
 
-        page = await self.browser.new_page()
         try:
-            await page.goto(url, timeout=10000)
-            content = await page.content()
-            return content
+            return await self.browser_pool.fetch(url)
         except Exception as e:
             print(f"⚠️ Playwright error fetching {url}: {e}")
             return ""  # Always return a string even on failure
-        finally:
-            await page.close()  # ✅ Always close the page but keep the browser open
 
 
-    async def extract_full_text(self, session, url):
-        """Extracts full text with multiple fallback methods, including JavaScript rendering."""
-        extracted_text = ""  # Ensure we always return a string
+    async def fetch_html(self, session, url, headers=None, cache_key=None, cache_entry=None):
+        """
+        Downloads a page with aiohttp.
 
-        # 1️⃣ Fetch raw HTML (normal request)
+        If a cache entry is given, the request is conditional (ETag / Last-Modified) and a
+        304 answer is served from the cache. Returns (html, not_modified); html is an empty
+        string on failure.
+        """
+        headers = headers or self.headers
+        if cache_entry:
+            headers = {**headers, **self.cache.conditional_headers(cache_entry)}
+
+        domain = self.get_domain(url)
+        started = time.perf_counter()
+        outcome = "ok"
         try:
-            async with session.get(url, headers=self.headers, timeout=10, compress=True) as response:
+            async with session.get(url, headers=headers, timeout=10, compress=True) as response:
+                if response.status == 304 and cache_entry:
+                    outcome = "not_modified"
+                    self.cache.stats["revalidated"] += 1
+                    self.cache.touch(cache_key, revalidated=True)
+                    return await asyncio.to_thread(self.cache.read_html, cache_entry), True
                 if response.status != 200:
+                    outcome = f"http_{response.status}"
                     print(f"⚠️ Failed to fetch {url} (Status Code: {response.status})")
-                    return ""  # Return empty string on failure
-                html = await response.text()
+                    return "", False  # Return empty string on failure
+                # 🚫 PDFs, images, feeds... are dropped before their body is downloaded
+                if "Content-Type" in response.headers and response.content_type not in HTML_CONTENT_TYPES:
+                    outcome = "not_html"
+                    print(f"🚫 Skipping {url} (Content-Type: {response.content_type})")
+                    return "", False
+                html, outcome = await self.read_html_body(response, url)
         except aiohttp.ClientError as e:
+            outcome = "network_error"
             print(f"⚠️ Network error fetching {url}: {e}")
-            return ""
+            return "", False
         except asyncio.TimeoutError:
+            outcome = "timeout"
             print(f"⏳ Timeout fetching {url}")
-            return ""
+            return "", False
+        finally:
+            self.metrics.observe("stage_seconds", time.perf_counter() - started, stage="html_fetch")
+            self.metrics.inc("html_fetch_total", outcome=outcome, domain=domain)
+
+        if self.cache and cache_key:
+            await asyncio.to_thread(
+                self.cache.store_html, cache_key, html,
+                response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+        return html, False
 
-        # 2️⃣ Try BeautifulSoup (Fastest)
+    async def read_html_body(self, response, url):
+        """
+        Streams a response body in chunks instead of buffering it whole.
+
+        Stops at `max_page_bytes` (the page is kept, truncated) or, if `early_stop_chars` is set,
+        as soon as that much paragraph text has been received. Returns (html, outcome).
+        """
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            paragraphs = soup.find_all("p")
-            extracted_text = "\n".join([p.get_text() for p in paragraphs])
-            if extracted_text and len(extracted_text) > 500:
+            decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        collector = ParagraphCollector() if self.early_stop_chars else None
+
+        parts, size, outcome = [], 0, "ok"
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            chunk = chunk[:self.max_page_bytes - size]
+            size += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if collector:
+                collector.feed(text)
+                if collector.chars >= self.early_stop_chars:
+                    outcome = "early_stop"
+                    break
+            if size >= self.max_page_bytes:
+                outcome = "truncated"
+                print(f"✂️ {url} is larger than {self.max_page_bytes // 1024} KB, keeping the first part only.")
+                break
+        parts.append(decoder.decode(b"", final=True))
+
+        self.metrics.inc("bytes_total", size, kind="html")
+        return "".join(parts), outcome
+
+    async def extract_full_text(self, session, url):
+        """Extracts full text, serving it from the on-disk cache when the page hasn't changed."""
+        cache_key = self.normalize_url(url) if self.cache else None
+        cached = self.cache.lookup(cache_key) if cache_key else None
+
+        # ♻️ Fresh cached text: no request and no parsing at all
+        if cached and cached["text_blob"] and self.cache.is_fresh(cached):
+            cached_text = await asyncio.to_thread(self.cache.read_text, cached)
+            if cached_text:
+                self.cache.stats["hits"] += 1
+                self.cache.touch(cache_key)
+                return cached_text
+
+        # 1️⃣ Fetch raw HTML (conditional request if we have a stale copy)
+        html, not_modified = await self.fetch_html(session, url, cache_key=cache_key, cache_entry=cached)
+        if not html:
+            return ""
+
+        if not_modified and cached["text_blob"]:
+            cached_text = await asyncio.to_thread(self.cache.read_text, cached)
+            if cached_text:
+                self.cache.stats["hits"] += 1
+                return cached_text
+
+        if self.cache:
+            self.cache.stats["misses"] += 1
+            if cached and not not_modified:
+                self.cache.stats["stale"] += 1  # Page changed since we cached it
+
+        extracted_text = await self.run_extraction_cascade(session, url, html)
+
+        if self.cache and len(extracted_text) > 500:
+            await asyncio.to_thread(self.cache.store_text, cache_key, extracted_text)
+        return extracted_text
+
+    async def run_extraction_cascade(self, session, url, html):
+        """
+        Extracts full text with multiple fallback methods, including JavaScript rendering.
+
+        The order is picked per domain by DomainStrategy: the method that has worked best
+        for this site runs first, then the rest of the default cascade.
+        """
+        domain = self.get_domain(url)
+        state = {"html": html, "js_html": ""}  # Shared between methods (e.g. Newspaper3k reuses rendered HTML)
+        extracted_text = ""  # Ensure we always return a string
+
+        for method in self.strategy.order(domain):
+            started = time.perf_counter()
+            extracted_text = await getattr(self, f"extract_with_{method}")(session, url, state)
+            success = bool(extracted_text) and len(extracted_text) > 500
+            latency = time.perf_counter() - started
+            self.strategy.record(domain, method, success, latency)
+            self.metrics.observe("stage_seconds", latency, stage="extract", method=method)
+            self.metrics.inc("extraction_total", method=method, outcome="success" if success else "failure")
+            if success:
                 return self.clean_text(extracted_text)
+
+        return self.clean_text(extracted_text)  # ✅ Always return a string
+
+    async def extract_with_soup(self, session, url, state):
+        """BeautifulSoup over the raw HTML (fastest)."""
+        try:
+            return await self.run_parser(extract_paragraph_text, state["html"], self.html_parser)
         except Exception as e:
             print(f"⚠️ BeautifulSoup failed for {url}: {e}")
+            return ""
 
-        # 3️⃣ Try Unstructured if BeautifulSoup fails
+    async def extract_with_unstructured(self, session, url, state):
+        """Unstructured element partitioning over the raw HTML."""
         try:
-            text_elements = partition_html(text=html)
-            extracted_text = " ".join([elem.text for elem in text_elements if elem.text.strip()])
-            if extracted_text and len(extracted_text) > 500:
-                return self.clean_text(extracted_text)
+            return await self.run_parser(extract_unstructured_text, state["html"])
         except Exception as e:
             print(f"⚠️ Unstructured parsing failed for {url}: {e}")
+            return ""
 
-        # 4️⃣ If both BeautifulSoup & Unstructured fail, try Playwright (JavaScript rendering)
+    async def extract_with_playwright(self, session, url, state):
+        """Renders the page with Playwright (JavaScript-heavy sites) and extracts its paragraphs."""
         try:
             print(f"🔄 Fetching {url} with Playwright...")
-            js_html = await self.fetch_js_page(url)  # ✅ Fetch dynamically rendered HTML
-            soup = BeautifulSoup(js_html, "html.parser")
-            paragraphs = soup.find_all("p")
-            extracted_text = "\n".join([p.get_text() for p in paragraphs])
-            if extracted_text and len(extracted_text) > 500:
-                return self.clean_text(extracted_text)
+            state["js_html"] = await self.fetch_js_page(url)  # ✅ Fetch dynamically rendered HTML
+            return await self.run_parser(extract_paragraph_text, state["js_html"], self.html_parser)
         except Exception as e:
             print(f"⚠️ Playwright failed for {url}: {e}")
+            return ""
 
-        # 5️⃣ If all else fails, use Newspaper3k
+    async def extract_with_newspaper(self, session, url, state):
+        """Newspaper3k on the HTML we already have (rendered first, then raw), with an optional re-download."""
+        extracted_text = ""
         try:
-            article = Article(url, browser_user_agent=self.safe_user_agent())
-            article.download()
-            article.parse()
-            extracted_text = article.text
-            if extracted_text and len(extracted_text) > 500:
-                return self.clean_text(extracted_text)
+            for candidate_html in (state["js_html"], state["html"]):
+                if not candidate_html:
+                    continue
+                extracted_text = await self.run_parser(extract_newspaper_text, url, candidate_html)
+                if extracted_text and len(extracted_text) > 500:
+                    return extracted_text
+
+            # Optional last resort: re-download with a fresh user agent, still without blocking the loop
+            if self.newspaper_refetch:
+                refetched_html, _ = await self.fetch_html(
+                    session, url, headers={**self.headers, "User-Agent": self.safe_user_agent()}
+                )
+                if refetched_html:
+                    extracted_text = await self.run_parser(extract_newspaper_text, url, refetched_html)
         except Exception as e:
             print(f"⚠️ Newspaper3k failed for {url}: {e}")
+        return extracted_text
 
-        return self.clean_text(extracted_text)  # ✅ Always return a string
+    @staticmethod
+    def get_domain(url):
+        """Returns the host of a URL (without 'www.') for per-domain rate limiting."""
+        netloc = urlparse(url).netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    async def extract_with_limits(self, session, url):
+        """Runs extract_full_text under the global and per-domain concurrency caps."""
+        if self.extract_semaphore is None:
+            self.extract_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        domain = self.get_domain(url)
+        if domain not in self.domain_semaphores:
+            self.domain_semaphores[domain] = asyncio.Semaphore(self.per_domain_concurrency)
+
+        async with self.domain_semaphores[domain]:
+            async with self.extract_semaphore:
+                try:
+                    return await self.extract_full_text(session, url)
+                except Exception as e:
+                    print(f"⚠️ Unexpected error extracting {url}: {e}")
+                    return ""
+
+    async def extract_page_articles(self, session, articles, failed_requests):
+        """
+        Extracts full text for one API page concurrently.
+
+        Articles are scheduled in waves: each wave reserves a slot against `max_articles`
+        and the per-source quota before fetching, so we never extract more than we can keep.
+        If some extractions fail, their slots are released and the next wave picks up the
+        articles that were held back.
+        """
+        remaining = list(articles)
+
+        while remaining and self.articles_fetched < self.max_articles:
+            wave, deferred = [], []
+            reserved = defaultdict(int)  # In-flight articles per source in this wave
+            wave_keys = set()  # Hashes and URLs already scheduled in this wave
+
+            for article in remaining:
+                url = article.get("url", "")
+                title = article.get("title", "Unknown title")
+                description = article.get("description", "No description available")
+                source = article.get("source", "Unknown source")
+
+                # Domain sharding: other workers own this site
+                if self.shard_by == "domain" and self.shard_count > 1 and \
+                        shard_for(self.get_domain(url), self.shard_count) != self.shard_index:
+                    continue
+
+                article_hash = self.get_article_hash(title, description)
+                normalized_url = self.normalize_url(url)
+
+                # Check for duplicates against this run and the persistent index before any fetch/parse work
+                skip_reason = self.database.is_known(article_hash, normalized_url)
+                if article_hash in self.duplicate_hashes or (normalized_url and normalized_url in self.seen_urls):
+                    skip_reason = "duplicate_in_run"
+                elif not skip_reason and self.source_count[source] >= self.max_per_source:
+                    skip_reason = "source_quota"
+                if skip_reason:
+                    self.skip_counts[skip_reason] += 1
+                    self.metrics.inc("skipped_total", reason=skip_reason)
+                    if skip_reason != "source_quota":
+                        self.metrics.inc("dedup_checks_total", result="hit")
+                    continue
+
+                # Quota already reserved by in-flight articles: retry in a later wave if one fails
+                if (article_hash in wave_keys or (normalized_url and normalized_url in wave_keys)
+                        or self.source_count[source] + reserved[source] >= self.max_per_source
+                        or self.articles_fetched + len(wave) >= self.max_articles):
+                    deferred.append(article)
+                    continue
+
+                # Sharded run: claim the article across all workers (global dedup and quotas)
+                if self.ledger:
+                    claim = self.ledger.claim(
+                        (article_hash, normalized_url), source, self.max_per_source, self.max_articles
+                    )
+                    if claim == "duplicate_in_run":
+                        self.skip_counts[claim] += 1
+                        self.metrics.inc("skipped_total", reason=claim)
+                        continue
+                    if claim:
+                        deferred.append(article)  # Another worker's slot may free up
+                        continue
 
-    async def fetch_articles(self):
-        """Fetches articles with improved API query handling and optimized checks."""
-        async with aiohttp.ClientSession() as session:
-            for call in range(self.max_api_calls):
-                if self.articles_fetched >= self.max_articles:
-                    break  # Stop if max articles are fetched
-                
-                failed_requests = []  # ✅ Track failed URLs and their status codes
-
-                print(f"📡 API Call {call + 1}/{self.max_api_calls} | Offset: {call * 100}")
-
-                # Set the offset dynamically for pagination
-                params = {
-                    "access_key": self.api_key,
-                    "countries": "us",
-                    "limit": 100,  # Max articles per request
-                    "offset": call * 100  # Offset ensures we fetch different articles each call
-                }
+                reserved[source] += 1
+                self.metrics.inc("dedup_checks_total", result="miss")
+                wave_keys.update((article_hash, normalized_url))
+                wave.append((article, article_hash, url, normalized_url, source))
+
+            if not wave:
+                break
+
+            # Extract full content for the whole wave at once
+            contents = await asyncio.gather(*(self.extract_with_limits(session, url) for _, _, url, _, _ in wave))
+
+            # Content fingerprints for near-duplicate detection (computed in the parser pool)
+            signatures = await asyncio.gather(*(
+                self.run_parser(minhash_signature, content) if self.near_duplicates and content else asyncio.sleep(0)
+                for content in contents
+            ))
+
+            for (article, article_hash, url, normalized_url, source), full_content, signature in zip(
+                    wave, contents, signatures):
+                domain = self.get_domain(url)
+                if not full_content or len(full_content) < 500:
+                    failed_requests.append((url, "Content Too Short"))  # ✅ Track short content failures
+                    self.metrics.inc("articles_total", outcome="content_too_short", domain=domain)
+                    if self.ledger:
+                        self.ledger.release(source)
+                    continue
+
+                if signature:
+                    match = self.near_duplicates.query(signature, article_hash)
+                    if match and self.near_duplicate_action == "skip":
+                        print(f"🧬 Skipping near-duplicate of {match[0]} ({match[1]:.0%} similar): {url}")
+                        self.skip_counts["near_duplicate"] += 1
+                        self.metrics.inc("articles_total", outcome="near_duplicate", domain=domain)
+                        self.duplicate_hashes.add(article_hash)
+                        if self.ledger:
+                            self.ledger.release(source)
+                        continue
+                    if match:
+                        article["near_duplicate_of"] = match[0]
+                    self.near_duplicates.reserve(article_hash, signature)  # Indexed once the batch is stored
+
+                # Store article
+                article["hash"] = article_hash
+                article["content"] = full_content
+                with self.metrics.timer("stage_seconds", stage="buffer"):
+                    self.database.buffer_article(article)
+                self.metrics.inc("articles_total", outcome="stored", domain=domain)
+                self.duplicate_hashes.add(article_hash)
+                self.seen_urls.add(normalized_url)
+                self.source_count[source] += 1
+                self.articles_fetched += 1
+
+            await self.flush_batch()
+            remaining = deferred
+
+    async def fetch_api_page(self, session, call):
+        """
+        Fetches one page of mediastack results through the rate limiter.
+
+        429/503 answers pause the limiter for Retry-After seconds (or an exponential backoff)
+        and are retried. Returns the list of articles, or None if the page couldn't be fetched.
+        """
+        # Set the offset dynamically for pagination
+        params = {
+            "access_key": self.api_key,
+            "countries": "us",
+            "limit": 100,  # Max articles per request
+            "offset": call * 100  # Offset ensures we fetch different articles each call
+        }
 
+        for attempt in range(self.api_max_retries + 1):
+            await self.api_limiter.acquire()
+            started = time.perf_counter()
+            try:
                 # ✅ Use `self.headers` instead of redefining headers
-                async with session.get(BASE_URL, params=params, headers=self.headers, timeout=10, compress=True) as response:
+                async with session.get(self.base_url, params=params, headers=self.headers, timeout=10, compress=True) as response:
+                    self.metrics.inc("api_calls_total", status=response.status)
+                    if response.status in (429, 503):
+                        delay = parse_retry_after(response.headers.get("Retry-After")) or 15 * (2 ** attempt)
+                        print(f"🚦 API rate limited (Status Code: {response.status}). Retrying in {delay:.0f}s...")
+                        self.api_limiter.pause(delay)
+                        continue
+
                     if response.status != 200:
                         print(f"🚨 API Request Failed (Status Code: {response.status})")
-                        continue  # Skip to the next API call if request fails
-
-                    try:
-                        # ✅ Read raw response data
-                        raw_data = await response.read()
-
-                        # ✅ Manually decompress Brotli if needed
-                        if response.headers.get("Content-Encoding") == "br":
-                            raw_data = brotli.decompress(raw_data)  # 🔥 Decompress Brotli response
-
-                        # ✅ Convert to JSON
-                        news_data = json.loads(raw_data.decode("utf-8"))
-                        articles = news_data.get("data", [])
-
-                        if not isinstance(articles, list):  # Ensure "data" is a list
-                            raise ValueError("Invalid API response format.")
+                        return None
+
+                    # ✅ Read raw response data
+                    raw_data = await response.read()
+                    self.metrics.inc("bytes_total", len(raw_data), kind="api")
+                    content_encoding = response.headers.get("Content-Encoding")
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.inc("api_calls_total", status="network_error")
+                print(f"⚠️ Network error calling the API (attempt {attempt + 1}): {e!r}")
+                self.api_limiter.pause(2 ** attempt)
+                continue
+            finally:
+                self.metrics.observe("stage_seconds", time.perf_counter() - started, stage="api_call")
 
-                    except Exception:
-                        print(f"⚠️ Error parsing API response: {traceback.format_exc()}")
-                        continue
+            try:
+                # ✅ Manually decompress Brotli if needed
+                if content_encoding == "br":
+                    raw_data = brotli.decompress(raw_data)  # 🔥 Decompress Brotli response
+
+                # ✅ Convert to JSON
+                news_data = json.loads(raw_data.decode("utf-8"))
+                articles = news_data.get("data", [])
+
+                if not isinstance(articles, list):  # Ensure "data" is a list
+                    raise ValueError("Invalid API response format.")
+                return articles
+
+            except Exception:
+                print(f"⚠️ Error parsing API response: {traceback.format_exc()}")
+                return None
+
+        print(f"🚨 Giving up on API page at offset {call * 100} after {self.api_max_retries + 1} attempts.")
+        return None
+
+    async def save_checkpoint(self, next_call):
+        """
+        Atomically writes the run's progress: the next API call, the counters used for quotas and
+        dedup, and every article not yet committed to ChromaDB (buffered or in the commit queue).
+        """
+        self.next_call = next_call
+        if not self.checkpoint_path:
+            return
+        pending = list(self.database.articles_batch)
+        for batch in list(self.uncommitted.values()):
+            pending.extend(batch)
+        state = {
+            "saved_at": datetime.utcnow().isoformat(),
+            "next_call": next_call,
+            "max_api_calls": self.max_api_calls,
+            "shard": [self.shard_index, self.shard_count, self.shard_by],
+            "articles_fetched": self.articles_fetched,
+            "source_count": dict(self.source_count),
+            "skip_counts": dict(self.skip_counts),
+            "duplicate_hashes": sorted(self.duplicate_hashes),
+            "seen_urls": sorted(self.seen_urls),
+            "pending_articles": pending,
+            "archived_hashes": sorted(self.archived_uncommitted.copy()),
+        }
 
-                    for article in articles:
+        def write():
+            os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())  # Survive a machine crash, not just a process crash
+            os.replace(tmp_path, self.checkpoint_path)
+            # Spilled batches taken over by this run are in the checkpoint now
+            if os.path.exists(f"{self.failed_batches_path}.resumed"):
+                os.remove(f"{self.failed_batches_path}.resumed")
+
+        await asyncio.to_thread(write)
+
+    def load_checkpoint(self):
+        """Restores the state saved by save_checkpoint and returns the API call to continue from."""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            print("⚠️ No checkpoint found, starting from the first API call.")
+            return 0
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Could not read checkpoint ({e}), starting from the first API call.")
+            return 0
+
+        if state["shard"] != [self.shard_index, self.shard_count, self.shard_by]:
+            print(f"⚠️ Checkpoint was written by shard {state['shard']}, ignoring it.")
+            return 0
+
+        self.articles_fetched = state["articles_fetched"]
+        self.source_count.update(state["source_count"])
+        self.skip_counts.update(state["skip_counts"])
+        self.duplicate_hashes.update(state["duplicate_hashes"])
+        self.seen_urls.update(state["seen_urls"])
+        self.archived_uncommitted.update(state.get("archived_hashes", []))
+        # Articles committed just before the crash are already in the hash index
+        pending = state["pending_articles"] + self.load_failed_batches()
+        self.database.articles_batch = list({
+            article["hash"]: article for article in pending if article["hash"] not in self.database.existing_ids
+        }.values())
+        if self.near_duplicates:
+            # Their signatures were only held in memory by the crashed run
+            for article in self.database.articles_batch:
+                if article.get("content"):
+                    signature = minhash_signature(article["content"], self.near_duplicates.num_perm)
+                    self.near_duplicates.reserve(article["hash"], signature)
+        print(
+            f"⏯️ Resuming from checkpoint of {state['saved_at']}: API call {state['next_call'] + 1}, "
+            f"{self.articles_fetched} articles fetched, {len(self.database.articles_batch)} to commit."
+        )
+        return state["next_call"]
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def shard_calls(self):
+        """API call numbers this scraper handles (all of them unless sharding by offset)."""
+        if self.shard_by == "offset":
+            return list(range(self.shard_index, self.max_api_calls, self.shard_count))
+        return list(range(self.max_api_calls))
+
+    async def fetch_articles(self, resume=False):
+        """
+        Fetches articles with improved API query handling and optimized checks.
+
+        With resume=True, continues from the last checkpoint instead of the first API call.
+        """
+        start_call = self.load_checkpoint() if resume else 0
+        self.next_call = start_call
+        await self.start_commit_worker()
+        pages = {}  # API call number -> prefetch task
+        try:
+            async with aiohttp.ClientSession() as session:
+                try:
+                    calls = [call for call in self.shard_calls() if call >= start_call]
+                    for position, call in enumerate(calls):
                         if self.articles_fetched >= self.max_articles:
-                            break
-
-                        url = article.get("url", "")
-                        title = article.get("title", "Unknown title")
-                        description = article.get("description", "No description available")
-                        source = article.get("source", "Unknown source")
-
-                        article_hash = self.get_article_hash(title, description)
-
-                        # Check for duplicates
-                        if article_hash in self.duplicate_hashes or self.source_count[source] >= 5:
-                            continue
-
-                        # Extract full content
-                        full_content = await self.extract_full_text(session, url)
-                        if not full_content or len(full_content) < 500:
-                            failed_requests.append((url, "Content Too Short"))  # ✅ Track short content failures
-                            continue
-
-                        # Store article
-                        article["hash"] = article_hash
-                        article["content"] = full_content
-                        self.database.buffer_article(article)
-                        self.source_count[source] += 1
-                        self.articles_fetched += 1
-
-                # ✅ Print final API call summary
-                print(f"✅ Finished API Call {call + 1}/{self.max_api_calls} | Articles fetched: {self.articles_fetched}/{self.max_articles}")
-
-                # ✅ Print failure summary (if any)
-                if failed_requests:
-                    failure_counts = {}
-                    for _, reason in failed_requests:
-                        failure_counts[reason] = failure_counts.get(reason, 0) + 1
-                    print(f"⚠️ Failed Requests Summary: {failure_counts}")
-
-                # Wait between API calls if needed
-                if call < self.max_api_calls - 1 and self.articles_fetched < self.max_articles:
-                    print(f"⏳ Waiting {self.wait_time} seconds before next API call...")
-                    await asyncio.sleep(self.wait_time)
-            # Save all articles fetched in this batch
-        print(f"🔄 Final check: {len(self.database.articles_batch)} articles in batch before commit.")
+                            break  # Stop if max articles are fetched
+                        if self.ledger and self.ledger.total() >= self.max_articles:
+                            break  # The workers together have reached max_articles
+
+                        failed_requests = []  # ✅ Track failed URLs and their status codes
+
+                        # ⚡ Prefetch the next pages while this page's articles are being extracted
+                        for ahead in calls[position:position + 1 + self.prefetch_pages]:
+                            if ahead not in pages:
+                                pages[ahead] = asyncio.create_task(self.fetch_api_page(session, ahead))
+
+                        print(f"📡 API Call {call + 1}/{self.max_api_calls} | Offset: {call * 100}")
+
+                        articles = await pages.pop(call)
+                        if articles is not None:  # Skip to the next API call if request fails
+                            await self.extract_page_articles(session, articles, failed_requests)
+
+                            # ✅ Print final API call summary
+                            print(f"✅ Finished API Call {call + 1}/{self.max_api_calls} | Articles fetched: {self.articles_fetched}/{self.max_articles}")
+
+                            # ✅ Print failure summary (if any)
+                            if failed_requests:
+                                failure_counts = {}
+                                for _, reason in failed_requests:
+                                    failure_counts[reason] = failure_counts.get(reason, 0) + 1
+                                print(f"⚠️ Failed Requests Summary: {failure_counts}")
+
+                        # 💾 This page is done: a crash from here on resumes at the next one
+                        await self.save_checkpoint(call + 1)
+                finally:
+                    # Pages prefetched past the point where we stopped aren't needed
+                    for task in pages.values():
+                        task.cancel()
+        finally:
+            # Save all articles fetched in this batch (also if the run was interrupted by an error)
+            print(f"🔄 Final check: {len(self.database.articles_batch)} articles in batch before commit.")
+            await self.stop_commit_worker()
+            # Whatever couldn't be committed stays in the checkpoint for --resume
+            await self.save_checkpoint(self.next_call)
+        if not self.uncommitted and not os.path.exists(self.failed_batches_path):
+            self.clear_checkpoint()  # Run complete, nothing left to resume
         print(f"📝 Total unique articles fetched this run: {self.articles_fetched}")
-        if not self.database.articles_batch:
-            print("⚠️ No articles to commit to ChromaDB.")
-        else:
-            self.database.commit_articles()
-        print(f"✅ Committed {len(self.database.articles_batch)} articles to ChromaDB.")
+        if self.skip_counts:
+            print(f"🚫 Skipped before fetching: {dict(self.skip_counts)}")
+        print(f"✅ Committed {self.database.total_articles_saved} articles to ChromaDB.")
+        if self.cache:
+            print(f"♻️ Article cache: {self.cache.summary()}")
+        self.strategy.save()
+        self.write_run_summary()
+
+    def write_run_summary(self):
+        """Exports the run's metrics as a Prometheus text file and a JSON run summary in the state directory."""
+        self.metrics.write_prometheus(os.path.join(self.state_dir, "metrics.prom"))
+        summary_path = os.path.join(self.state_dir, "run_summary.json")
+        self.metrics.write_summary(summary_path, extra={
+            "finished_at": datetime.utcnow().isoformat(),
+            "articles_fetched": self.articles_fetched,
+            "articles_committed": self.database.total_articles_saved,
+            "skipped": dict(self.skip_counts),
+            "cache": self.cache.summary() if self.cache else None,
+        })
+        print(f"📈 Metrics written to {self.state_dir}/metrics.prom and {summary_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch news from mediastack, extract full text and store it in ChromaDB.")
+    parser.add_argument("--api-key", default=API_KEY, help="mediastack API key (default: API_KEY from .env)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the last checkpoint (API offset, counters and uncommitted articles)")
+    args = parser.parse_args()
+
     # ✅ Initialize ChromaDB client
     db_client = chromadb.PersistentClient(path="./chroma_db")
 
     # ✅ Ensure "news_articles" collection exists
-    collection = db_client.get_or_create_collection("news_articles")
+    store = NewsStore.open(db_client, metadata={"hnsw:space": "cosine"})
 
-    # ✅ Check if collection has any existing articles
-    existing_data = collection.get(include=["metadatas"])
-    if existing_data and "metadatas" in existing_data and existing_data["metadatas"]:
-        print(f"📂 Found {len(existing_data['metadatas'])} existing articles in ChromaDB.")
+    # ✅ Check if collection has any existing articles (count only, nothing is fetched)
+    existing_count = store.count()
+    if existing_count:
+        print(f"📂 Found {existing_count} existing articles in ChromaDB.")
     else:
         print("⚠️ No articles found in ChromaDB. Starting fresh.")
 
@@ -451,17 +1361,17 @@ if __name__ == "__main__":
 
     # ✅ Scraper logic
     save_json = os.getenv("SAVE_JSON", "True").lower() == "true"
-    scraper = NewsScraper(api_key=API_KEY, save_json=save_json)
+    scraper = NewsScraper(api_key=args.api_key, save_json=save_json)
 
     # ✅ Run async function safely
     try:
-        asyncio.run(scraper.fetch_articles())
+        asyncio.run(scraper.fetch_articles(resume=args.resume))
     except RuntimeError as e:
         if "Event loop is closed" in str(e):
             print("⚠️ Event loop closed unexpectedly. Restarting loop...")
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(scraper.fetch_articles())
+            loop.run_until_complete(scraper.fetch_articles(resume=True))
 
     # Close Playwright safely
     try:
@@ -470,6 +1380,8 @@ if __name__ == "__main__":
         if "Event loop is closed" in str(e):
             print("⚠️ Event loop already closed while shutting down Playwright.")
 
+    scraper.close_parse_pool()
+
     # ✅ Save all articles to DB at the end
     scraper.finalize_scraping()
 
@@ -488,4 +1400,7 @@ if __name__ == "__main__":
 # python data_collect.py
 #
 # Or with your own API Key
-# python data_collect.py --api-key YOUR_API_KEY
\ No newline at end of file
+# python data_collect.py --api-key YOUR_API_KEY
+#
+# After a crash, continue where the last run stopped
+# python data_collect.py --resume
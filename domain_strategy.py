@@ -0,0 +1,102 @@
+import os
+import json
+import random
+import threading
+
+
+# Default extraction cascade, cheapest first
+EXTRACTION_METHODS = ["soup", "unstructured", "playwright", "newspaper"]
+
+
+class DomainStrategy:
+    """
+    Learns which extraction method works for each domain and tries it first.
+
+    Tracks attempts, successes and latency per (domain, method), persists them between runs,
+    and occasionally falls back to the default order so a site that changes layout gets re-checked.
+    """
+
+    def __init__(self, path="scraper_state/domain_strategy.json", adaptive=True, explore_rate=0.1,
+                 min_attempts=3, min_success_rate=0.6, max_attempts=50):
+        """
+        Args:
+        - path (str): JSON file the stats are persisted to.
+        - adaptive (bool): If False, always use the default cascade (stats are still recorded).
+        - explore_rate (float): Share of articles that use the default order to re-check other methods.
+        - min_attempts (int): Samples needed before a method can be promoted for a domain.
+        - min_success_rate (float): Success rate a method needs to be promoted.
+        - max_attempts (int): Counts are halved past this, so old behaviour fades out.
+        """
+        self.path = path
+        self.adaptive = adaptive
+        self.explore_rate = explore_rate
+        self.min_attempts = min_attempts
+        self.min_success_rate = min_success_rate
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.stats = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Could not load domain strategy stats ({e}). Starting fresh.")
+            return {}
+
+    def save(self):
+        """Writes the stats atomically so a crash never leaves a half-written file."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.stats, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def order(self, domain):
+        """Returns the extraction methods to try for a domain, best known method first."""
+        if not self.adaptive or random.random() < self.explore_rate:
+            return list(EXTRACTION_METHODS)
+
+        best_method, best_cost = None, None
+        for method, entry in self.stats.get(domain, {}).items():
+            if method not in EXTRACTION_METHODS or entry["attempts"] < self.min_attempts:
+                continue
+            success_rate = entry["successes"] / entry["attempts"]
+            if success_rate < self.min_success_rate:
+                continue
+            # Expected seconds per successful extraction
+            cost = (entry["latency"] / entry["attempts"]) / success_rate
+            if best_cost is None or cost < best_cost:
+                best_method, best_cost = method, cost
+
+        if best_method is None:
+            return list(EXTRACTION_METHODS)
+        return [best_method] + [m for m in EXTRACTION_METHODS if m != best_method]
+
+    def record(self, domain, method, success, latency):
+        """Records one attempt of `method` on `domain`."""
+        with self.lock:
+            entry = self.stats.setdefault(domain, {}).setdefault(
+                method, {"attempts": 0, "successes": 0, "latency": 0.0}
+            )
+            entry["attempts"] += 1
+            entry["successes"] += int(success)
+            entry["latency"] += latency
+
+            if entry["attempts"] > self.max_attempts:
+                entry["attempts"] /= 2
+                entry["successes"] /= 2
+                entry["latency"] /= 2
+
+    def summary(self, domain):
+        """Per-method success rate and mean latency for a domain."""
+        return {
+            method: {
+                "success_rate": round(entry["successes"] / entry["attempts"], 2),
+                "avg_latency": round(entry["latency"] / entry["attempts"], 3),
+            }
+            for method, entry in self.stats.get(domain, {}).items() if entry["attempts"]
+        }
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+from chromadb.utils import embedding_functions
+
+
+# Explicit embedding stage for chroma_ingest.py.
+# Documents are embedded in length-sorted batches (less padding per batch) and every vector is cached
+# on disk by (content hash, model), so re-ingesting an article, or the same text arriving from another
+# archive, never pays for the model again. Vectors are handed to Chroma with `embeddings=`.
+
+# Chroma's built-in model (all-MiniLM-L6-v2 on ONNX Runtime), which collections use when nothing else is set
+DEFAULT_EMBEDDING_MODEL = "default"
+
+
+def content_hash(document):
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def load_embedding_function(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Chroma's default embedding function, or a sentence-transformers model by name.
+
+    Queries must be embedded with the same model, so only change it together with the
+    collection's embedding function.
+    """
+    if model_name == DEFAULT_EMBEDDING_MODEL:
+        return embedding_functions.DefaultEmbeddingFunction()
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+
+class EmbeddingCache:
+    def __init__(self, path):
+        """
+        Args:
+        - path (str): SQLite file holding the cached vectors (float32 blobs).
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT,
+                model TEXT,
+                vector BLOB,
+                PRIMARY KEY (content_hash, model)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+
+    def get_many(self, hashes, model):
+        """Returns {content_hash: vector} for the hashes that are cached for this model."""
+        found = {}
+        hashes = list(hashes)
+        with self.lock:
+            for i in range(0, len(hashes), 500):  # Stay under SQLite's bound-parameter limit
+                chunk = hashes[i:i + 500]
+                rows = self.db.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND content_hash IN ({','.join('?' * len(chunk))})", [model, *chunk]
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return found
+
+    def put_many(self, items, model):
+        """Stores (content_hash, vector) pairs."""
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, vector) VALUES (?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class Embedder:
+    def __init__(self, cache_path, model_name=DEFAULT_EMBEDDING_MODEL, batch_size=64, embedding_function=None):
+        """
+        Args:
+        - cache_path (str): SQLite file of the embedding cache.
+        - model_name (str): "default" (Chroma's model) or a sentence-transformers model name; also the cache key.
+        - batch_size (int): Documents per call to the model.
+        - embedding_function: Any Chroma-compatible embedding function, to override model_name's.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.embedding_function = embedding_function  # Loaded on first use
+        self.cache = EmbeddingCache(cache_path)
+        self.stats = {"cached": 0, "embedded": 0}
+
+    def embed(self, documents):
+        """Returns one float32 vector per document, from the cache where possible."""
+        hashes = [content_hash(document) for document in documents]
+        vectors = self.cache.get_many(set(hashes), self.model_name)
+
+        missing = {key: document for key, document in zip(hashes, documents) if key not in vectors}
+        self.stats["cached"] += len(documents) - len(missing)
+        if missing:
+            if self.embedding_function is None:
+                self.embedding_function = load_embedding_function(self.model_name)
+            # Similar lengths per batch = less padding work for the model
+            pending = sorted(missing.items(), key=lambda item: len(item[1]))
+            for i in range(0, len(pending), self.batch_size):
+                batch = pending[i:i + self.batch_size]
+                embedded = self.embedding_function([document for _, document in batch])
+                new_vectors = [(key, np.asarray(vector, dtype=np.float32)) for (key, _), vector in zip(batch, embedded)]
+                self.cache.put_many(new_vectors, self.model_name)
+                vectors.update(new_vectors)
+            self.stats["embedded"] += len(missing)
+
+        return [vectors[key].tolist() for key in hashes]
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+
+# Compact on-disk index of the article hashes / URLs already stored in the "news_articles" collection.
+# Keys are kept as 32-byte digests in SQLite, so startup doesn't need to pull every metadata dict
+# out of ChromaDB, and lookups stay fast however large the corpus grows.
+
+# Query parameters that only track where a click came from (utm_* is matched by prefix)
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "ref", "ref_src", "cmpid", "ocid", "smid", "smtyp", "sr_share", "guccounter",
+})
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL for cache keys and duplicate checks: lowercase scheme and host, no fragment,
+    tracking parameters dropped and the remaining query parameters sorted (so ?id=123 and ?id=456
+    stay different articles).
+    """
+    if not url:
+        return ""
+    parsed_url = urlparse(url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    normalized = f"{parsed_url.scheme.lower()}://{parsed_url.netloc.lower()}{parsed_url.path}"
+    return f"{normalized}?{urlencode(query)}" if query else normalized
+
+
+def to_digest(key):
+    """Stores SHA-256 hex ids as their raw 32 bytes; anything else (e.g. URLs) is hashed first."""
+    if len(key) == 64:
+        try:
+            return bytes.fromhex(key)
+        except ValueError:
+            pass
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+class HashIndex:
+    """Set-like view over one table of digests (supports `in`, len(), add() and update())."""
+
+    def __init__(self, path, name="ids"):
+        self.path = path
+        self.name = name
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Readers in other processes don't block writers
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {name} (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.db.commit()
+
+    def __contains__(self, key):
+        if not key:
+            return False
+        with self.lock:
+            return self.db.execute(
+                f"SELECT 1 FROM {self.name} WHERE digest = ?", (to_digest(key),)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def add(self, key):
+        self.update([key])
+
+    def update(self, keys):
+        """Adds keys in a single transaction."""
+        rows = [(to_digest(key),) for key in keys if key]
+        if not rows:
+            return
+        with self.lock:
+            self.db.executemany(f"INSERT OR IGNORE INTO {self.name} (digest) VALUES (?)", rows)
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute(f"DELETE FROM {self.name}")
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ArticleIndex:
+    """The ids and normalized URLs of every stored article, kept in one SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = HashIndex(path, "ids")
+        self.urls = HashIndex(path, "urls")
+
+    def add_articles(self, ids, metadatas):
+        """Records newly committed articles (call right after collection.add)."""
+        self.ids.update(ids)
+        self.urls.update(normalize_url(meta.get("url")) for meta in metadatas if meta and meta.get("url"))
+
+    def sync(self, store, page_size=1000):
+        """
+        Rebuilds the index from ChromaDB (a news_store.NewsStore) only if it's out of step with the
+        collection (first run, or entries added/deleted by another tool). Normal startups just compare counts.
+        """
+        total = store.count()
+        if len(self.ids) == total:
+            print(f"⚡ Hash index ready: {total} articles ({self.path}).")
+            return
+
+        print(f"🔄 Rebuilding hash index from ChromaDB ({total} articles)...")
+        self.ids.clear()
+        self.urls.clear()
+        for page in store.iter_pages(("metadatas",), page_size):
+            self.add_articles(page["ids"], page["metadatas"] or [])
+        print(f"✅ Hash index rebuilt: {len(self.ids)} articles.")
+
+    def close(self):
+        self.ids.close()
+        self.urls.close()
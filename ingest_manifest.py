@@ -0,0 +1,102 @@
+import os
+import time
+import sqlite3
+import hashlib
+
+
+# Records which NEWS_FILES archives chroma_ingest.py has already loaded, so each run only reads new data.
+# Files are keyed by path and fingerprinted by size, mtime and a checksum. JSONL archives are append-only,
+# so for them we also keep the byte offset ingested so far and resume from it when the file grows.
+
+CHECKSUM_WINDOW = 64 * 1024  # Bytes hashed at the start of the file and just before the ingested offset
+
+APPEND_ONLY_EXTENSIONS = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+
+def file_checksum(path, offset):
+    """
+    SHA-256 of the file's first bytes and of the bytes just before `offset`.
+
+    Cheap to compute however large the file is, and changes if the part we already
+    ingested is rewritten (rather than appended to).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(CHECKSUM_WINDOW, offset)))
+        if offset > CHECKSUM_WINDOW:
+            f.seek(max(CHECKSUM_WINDOW, offset - CHECKSUM_WINDOW))
+            digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    def __init__(self, path):
+        """
+        Args:
+        - path (str): SQLite file holding one row per ingested archive.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                checksum TEXT,
+                offset INTEGER,
+                articles INTEGER DEFAULT 0,
+                ingested_at REAL
+            )
+        """)
+        self.db.commit()
+
+    def plan(self, path):
+        """
+        Decides what to read from a file: returns (start, end) byte offsets, or None if it's unchanged.
+
+        Append-only archives that grew are read from where the last run stopped; anything else
+        that changed (rewritten, truncated, a legacy .json edited) is read again from the start.
+        """
+        stat = os.stat(path)
+        row = self.db.execute(
+            "SELECT size, mtime, checksum, offset FROM files WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        if row is None:
+            return (0, stat.st_size)
+
+        size, mtime, checksum, offset = row
+        if stat.st_size == size and stat.st_mtime == mtime:
+            return None
+        if stat.st_size >= offset and file_checksum(path, offset) == checksum:
+            if stat.st_size == offset:
+                return None  # Only touched, content unchanged
+            if path.endswith(APPEND_ONLY_EXTENSIONS):
+                return (offset, stat.st_size)
+        return (0, stat.st_size)
+
+    def record(self, path, end, articles):
+        """Marks a file as ingested up to byte `end`."""
+        stat = os.stat(path)
+        self.db.execute(
+            """
+            INSERT INTO files (path, size, mtime, checksum, offset, articles, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size, mtime = excluded.mtime, checksum = excluded.checksum,
+                offset = excluded.offset, articles = files.articles + excluded.articles,
+                ingested_at = excluded.ingested_at
+            """,
+            # If the file grew while we read it, store no mtime so the next plan() checks the checksum
+            (os.path.abspath(path), end, stat.st_mtime if stat.st_size == end else 0,
+             file_checksum(path, end), end, articles, time.time())
+        )
+        self.db.commit()
+
+    def forget(self, path):
+        """Drops a file's entry (e.g. after it was quarantined)."""
+        self.db.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(path),))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import threading
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+
+# Lazy registry for the NLP models used by RAG_processing.py.
+# Models are registered as loader functions and only loaded the first time they're used (or when
+# warmed up in a background thread), so a run only pays the time and memory of the models it needs.
+
+def current_rss_mb():
+    """
+    Resident memory of this process in MB (peak RSS where the current value isn't available),
+    or None where neither can be read (e.g. Windows).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return None
+        scale = 1024 ** 2 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class ModelRegistry:
+    def __init__(self):
+        self.loaders = {}  # name -> zero-argument function returning the model
+        self.models = {}
+        self.locks = {}  # One lock per model: concurrent first uses wait for a single load
+        self.stats = {}  # name -> {"load_seconds": ..., "rss_delta_mb": ...} (RSS is approximate if loads overlap)
+        self.lock = threading.Lock()
+
+    def register(self, name, loader):
+        """Registers a model under `name`; `loader` is only called on first use."""
+        with self.lock:
+            self.loaders[name] = loader
+            self.locks[name] = threading.Lock()
+
+    def get(self, name):
+        """Returns the model, loading it now if it isn't loaded yet."""
+        model = self.models.get(name)
+        if model is not None:
+            return model
+
+        with self.locks[name]:
+            if name not in self.models:  # Another thread may have loaded it while we waited
+                print(f"⏳ Loading model '{name}'...")
+                rss_before = current_rss_mb()
+                started = time.perf_counter()
+                self.models[name] = self.loaders[name]()
+                rss_after = current_rss_mb()
+                self.stats[name] = {
+                    "load_seconds": round(time.perf_counter() - started, 2),
+                    "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+                }
+                print(f"✅ Model '{name}' loaded in {self.stats[name]['load_seconds']}s"
+                      + (f" (+{self.stats[name]['rss_delta_mb']} MB)" if rss_before is not None else ""))
+        return self.models[name]
+
+    def is_loaded(self, name):
+        return name in self.models
+
+    def warm_up(self, names=None):
+        """
+        Loads models in a background thread, so they're ready (or partly loaded) by the time
+        they're first needed. Returns the thread; get() simply waits for a load in progress.
+        """
+        names = list(names or self.loaders)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Warm-up of model '{name}' failed: {e}")  # get() will raise again on real use
+
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name):
+        """Drops a loaded model so its memory can be reclaimed."""
+        with self.locks[name]:
+            self.models.pop(name, None)
+
+    def report(self):
+        """Load time and memory of every model loaded so far (and which ones were never needed)."""
+        for name in self.loaders:
+            if name in self.stats:
+                stats = self.stats[name]
+                memory = f", +{stats['rss_delta_mb']} MB" if stats["rss_delta_mb"] is not None else ""
+                print(f"   🧠 {name}: {stats['load_seconds']}s{memory}")
+            else:
+                print(f"   💤 {name}: not loaded")
+        rss = current_rss_mb()
+        if rss is not None:
+            print(f"   📦 Process RSS: {rss:.0f} MB")
+        return dict(self.stats)
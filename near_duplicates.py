@@ -0,0 +1,207 @@
+import os
+import re
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+from functools import lru_cache
+
+
+# Near-duplicate detection for syndicated articles (wire stories republished with small edits).
+# Articles are reduced to MinHash signatures over word 5-grams; LSH banding finds candidate matches
+# in the persistent index, and candidates are confirmed by their estimated Jaccard similarity.
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SHINGLE_SIZE = 5
+PERMUTATION_SEED = 1  # Fixed so signatures stay comparable across runs
+# Similarity at which LSH starts finding candidates. The banding depends only on this and num_perm, so
+# the index layout doesn't change with the threshold (which is applied when candidates are verified)
+LSH_CANDIDATE_SIMILARITY = 0.5
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm):
+    rng = random.Random(PERMUTATION_SEED)
+    return [(rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """32-bit hashes of the word k-grams of a text."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < k:
+        grams = {" ".join(words)} if words else set()
+    else:
+        grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams}
+
+
+def minhash_signature(text, num_perm=128):
+    """MinHash signature of a text (module-level so it can run in a process pool)."""
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return [MAX_HASH] * num_perm
+    return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in _permutations(num_perm)]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def lsh_params(num_perm, candidate_similarity=LSH_CANDIDATE_SIMILARITY):
+    """
+    Picks (bands, rows) so the LSH S-curve's steep point, (1/bands)^(1/rows), sits just below
+    candidate_similarity (128 permutations -> 32 bands of 4 rows).
+
+    Erring low favours recall for any threshold above it: extra candidates are cheap because
+    each one is verified against its stored signature anyway.
+    """
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1 / bands) ** (1 / rows)
+        if best_point < point <= candidate_similarity:
+            best, best_point = (bands, rows), point
+    return best
+
+
+class NearDuplicateIndex:
+    def __init__(self, path, threshold=0.85, num_perm=128):
+        """
+        Args:
+        - path (str): SQLite file holding signatures and LSH buckets.
+        - threshold (float): Minimum estimated Jaccard similarity for two articles to count as near-duplicates.
+        - num_perm (int): Signature length (more = more accurate, slower).
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(num_perm)
+        self.lock = threading.Lock()
+        # Signatures of articles accepted but not stored yet: matched by query() in this process,
+        # only written to the index by confirm() once the article itself is stored
+        self.pending = {}  # doc_id -> signature
+        self.pending_buckets = {}  # (band, bucket) -> {doc_id, ...}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS signatures (doc_id TEXT PRIMARY KEY, signature BLOB)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket BLOB, doc_id TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)")
+
+        stored = self.db.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+        layout = f"{num_perm}:{self.bands}:{self.rows}"
+        if stored and stored[0].split(":")[0] != str(num_perm):
+            raise ValueError(
+                f"Near-duplicate index {path} holds signatures of num_perm={stored[0].split(':')[0]}, not {num_perm}. "
+                "Use the same num_perm or delete the file to rebuild it."
+            )
+        if stored and stored[0] != layout:
+            self._rebuild_buckets()  # Index written with the old threshold-dependent banding
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+        self.db.commit()
+
+    def _rebuild_buckets(self):
+        """Re-bands every stored signature (the signatures themselves don't depend on the layout)."""
+        print("🧬 Rebuilding near-duplicate LSH buckets for the current layout...")
+        self.db.execute("DELETE FROM buckets")
+        for doc_id, blob in self.db.execute("SELECT doc_id, signature FROM signatures").fetchall():
+            self.db.executemany(
+                "INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in self._band_buckets(array("Q", blob))]
+            )
+
+    def _band_buckets(self, signature):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, hashlib.blake2b(array("Q", rows).tobytes(), digest_size=8).digest()
+
+    def query(self, signature, doc_id=None):
+        """
+        Returns (doc_id, similarity) of the closest stored (or pending) near-duplicate, or None.
+
+        Args:
+        - signature (list): MinHash signature of the article.
+        - doc_id (str): The article's own id, never reported as its own near-duplicate.
+        """
+        with self.lock:
+            candidates = set()
+            for band, bucket in self._band_buckets(signature):
+                rows = self.db.execute(
+                    "SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ).fetchall()
+                candidates.update(candidate for (candidate,) in rows)
+                candidates.update(self.pending_buckets.get((band, bucket), ()))
+            candidates.discard(doc_id)
+
+            best = None
+            for candidate in candidates:
+                stored = self.pending.get(candidate)
+                if stored is None:
+                    row = self.db.execute(
+                        "SELECT signature FROM signatures WHERE doc_id = ?", (candidate,)
+                    ).fetchone()
+                    if not row:
+                        continue
+                    stored = array("Q", row[0])
+                similarity = estimate_similarity(signature, stored)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+        return best
+
+    def reserve(self, doc_id, signature):
+        """Holds an accepted article's signature in memory until confirm() (stored) or release() (write failed)."""
+        with self.lock:
+            self.pending[doc_id] = signature
+            for key in self._band_buckets(signature):
+                self.pending_buckets.setdefault(key, set()).add(doc_id)
+
+    def _drop_pending(self, doc_id):
+        signature = self.pending.pop(doc_id, None)
+        if signature is not None:
+            for key in self._band_buckets(signature):
+                bucket = self.pending_buckets.get(key)
+                if bucket:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self.pending_buckets[key]
+        return signature
+
+    def confirm(self, doc_ids):
+        """Writes the reserved signatures of articles that are now stored to the index."""
+        with self.lock:
+            signatures = [(doc_id, self._drop_pending(doc_id)) for doc_id in doc_ids]
+            self._insert([(doc_id, signature) for doc_id, signature in signatures if signature is not None])
+
+    def release(self, doc_ids):
+        """Forgets reserved signatures whose articles weren't stored, so a retry isn't matched against them."""
+        with self.lock:
+            for doc_id in doc_ids:
+                self._drop_pending(doc_id)
+
+    def add(self, doc_id, signature):
+        """Indexes an article's signature."""
+        with self.lock:
+            self._insert([(doc_id, signature)])
+
+    def _insert(self, items):
+        for doc_id, signature in items:
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO signatures (doc_id, signature) VALUES (?, ?)",
+                (doc_id, array("Q", signature).tobytes())
+            ).rowcount
+            if inserted:
+                self.db.executemany(
+                    "INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                    [(band, bucket, doc_id) for band, bucket in self._band_buckets(signature)]
+                )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
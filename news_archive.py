@@ -0,0 +1,222 @@
+import io
+import os
+import re
+import json
+import gzip
+from datetime import datetime
+
+# zstd compresses article text better and faster than gzip, but it's optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# orjson parses JSONL lines several times faster than the stdlib, also optional
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+
+# Append-only JSONL archive for NEWS_FILES.
+# Each batch is written as one compressed member (gzip) / frame (zstd) appended to the current file,
+# so a write costs O(batch) and never re-reads what's already on disk. Files rotate by time period
+# (hour/day) and by size.
+
+ARCHIVE_EXTENSIONS = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+TRUNCATION_ERRORS = (EOFError, zstandard.ZstdError) if zstandard else (EOFError,)
+ROTATION_FORMATS = {"hour": "%Y-%m-%d-%H", "day": "%Y-%m-%d"}
+
+
+def is_archive_file(filename):
+    """True for anything chroma_ingest.py can read: new JSONL archives and legacy .json dumps."""
+    return filename.endswith(ARCHIVE_EXTENSIONS) or filename.endswith(".json")
+
+
+class NewsArchiveWriter:
+    def __init__(self, news_dir="NEWS_FILES", compression=None, rotation="hour", max_bytes=256 * 1024 ** 2):
+        """
+        Args:
+        - news_dir (str): Directory the archives are written to.
+        - compression (str): "zstd", "gzip" or "none" (default: zstd if installed, else gzip).
+        - rotation (str): Start a new file every "hour" or "day".
+        - max_bytes (int): Also start a new part once the current file reaches this size.
+        """
+        self.news_dir = news_dir
+        self.compression = compression or ("zstd" if zstandard else "gzip")
+        if self.compression == "zstd" and zstandard is None:
+            print("⚠️ zstandard not installed, falling back to gzip archives.")
+            self.compression = "gzip"
+        self.rotation = rotation
+        self.max_bytes = max_bytes
+        os.makedirs(news_dir, exist_ok=True)
+
+    @property
+    def extension(self):
+        return {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}.get(self.compression, ".jsonl")
+
+    def current_path(self):
+        """Path of the file the next batch goes to (rotated by period, then by size)."""
+        stamp = datetime.utcnow().strftime(ROTATION_FORMATS[self.rotation])
+        part = 0
+        while True:
+            suffix = f"_{part}" if part else ""
+            path = os.path.join(self.news_dir, f"news_{stamp}{suffix}{self.extension}")
+            if not os.path.exists(path) or os.path.getsize(path) < self.max_bytes:
+                return path
+            part += 1
+
+    def append(self, articles):
+        """Appends a batch of articles and returns the archive path."""
+        if not articles:
+            return None
+
+        data = "".join(json.dumps(article, ensure_ascii=False) + "\n" for article in articles).encode("utf-8")
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor(level=3).compress(data)
+        elif self.compression == "gzip":
+            data = gzip.compress(data, compresslevel=6)
+
+        path = self.current_path()
+        # A single write of a complete member/frame: readers never see a half-encoded batch
+        with open(path, "ab") as f:
+            f.write(data)
+        return path
+
+
+class ByteRangeReader(io.RawIOBase):
+    """Raw reader over bytes [start, end) of a file, so a growing archive is read up to a fixed point."""
+
+    def __init__(self, path, start=0, end=None):
+        self.raw = open(path, "rb")
+        self.raw.seek(start)
+        self.remaining = (end - start) if end is not None else None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = len(buffer) if self.remaining is None else min(len(buffer), self.remaining)
+        data = self.raw.read(size)
+        buffer[:len(data)] = data
+        if self.remaining is not None:
+            self.remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def open_archive(path, start=0, end=None):
+    """
+    Opens an archive for streaming text reads, decompressing as needed.
+
+    start/end restrict reading to a byte range of the file. Every appended batch is a complete
+    gzip member / zstd frame, so an offset recorded between batches is a valid place to resume.
+    """
+    raw = io.BufferedReader(ByteRangeReader(path, start, end))
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raw.close()
+            raise ValueError(f"zstandard is required to read {path}")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    if path.endswith(".gz"):
+        # Reads concatenated members transparently
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="rb"), encoding="utf-8")
+    return io.TextIOWrapper(raw, encoding="utf-8")
+
+
+ARTICLES_KEY = re.compile(r'"articles"\s*:\s*\[')
+
+
+def iter_json_array(f, chunk_size=1024 ** 2):
+    """
+    Streams the elements of a legacy JSON dump: a top-level list, or the "articles" list of a
+    top-level object. Elements are decoded one by one with raw_decode from a sliding buffer,
+    so the file is never held in memory whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    eof = len(buffer) < chunk_size
+
+    # Find the start of the array
+    while True:
+        stripped = buffer.lstrip()
+        if stripped.startswith("["):
+            pos = len(buffer) - len(stripped) + 1
+            break
+        match = ARTICLES_KEY.search(buffer) if stripped.startswith("{") else None
+        if match:
+            pos = match.end()
+            break
+        more = f.read(chunk_size) if not stripped or stripped.startswith("{") else ""
+        if not more:
+            raise ValueError('Unexpected JSON structure (expected a list or {"articles": [...]})')
+        eof = len(more) < chunk_size
+        buffer += more
+
+    while True:
+        # Skip separators, refilling the buffer when it runs out
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = f.read(chunk_size), 0
+            eof = len(buffer) < chunk_size
+            if not buffer:
+                raise ValueError("Unexpected end of file inside the article list")
+        if buffer[pos] == "]":
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            # A value ending exactly at the end of the buffer may be cut short (a number split
+            # by the chunk boundary still decodes), so only trust it once the file has ended
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            more = f.read(chunk_size)
+            eof = len(more) < chunk_size  # read() only returns less than asked for at the end of the file
+            buffer, pos = buffer[pos:] + more, 0  # Element spans the chunk boundary
+            continue
+        yield element
+        pos = end
+        if pos >= chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_archive_articles(path, start=0, end=None, status=None):
+    """
+    Streams article dicts from an archive, one at a time.
+
+    JSONL files are read line by line (a truncated last line from a crashed write is skipped),
+    optionally from byte offset `start` up to `end`; legacy .json files are a list or
+    {"articles": [...]} and are always streamed whole, element by element.
+    If a `status` dict is given, status["truncated"] is set when the last batch was incomplete.
+    """
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter_json_array(f)
+        return
+
+    with open_archive(path, start, end) as f:
+        try:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping unreadable line {line_number} in {path}")
+        except TRUNCATION_ERRORS:
+            print(f"⚠️ {path} ends with an incomplete batch (interrupted write?). Skipping the rest.")
+            if status is not None:
+                status["truncated"] = True
@@ -0,0 +1,56 @@
+# Data-access layer over the "news_articles" ChromaDB collection.
+# Everything that only needs to know "is this id stored?" or "how many articles are there?" goes
+# through here, so no caller has to pull the whole collection's metadata to answer it.
+
+COLLECTION_NAME = "news_articles"
+
+
+class NewsStore:
+    def __init__(self, collection, batch_size=500):
+        """
+        Args:
+        - collection: The ChromaDB collection (e.g. client.get_or_create_collection("news_articles")).
+        - batch_size (int): Ids per existence-check request.
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+
+    @classmethod
+    def open(cls, client, name=COLLECTION_NAME, **collection_options):
+        """Gets (or creates) the collection on a ChromaDB client and wraps it."""
+        return cls(client.get_or_create_collection(name=name, **collection_options))
+
+    def count(self):
+        """Number of stored articles (count-only query, nothing is fetched)."""
+        return self.collection.count()
+
+    def existing_ids(self, ids):
+        """Returns the subset of `ids` already stored, checked in batches of ids (no metadata fetched)."""
+        ids = list(dict.fromkeys(i for i in ids if i))
+        found = set()
+        for i in range(0, len(ids), self.batch_size):
+            found.update(self.collection.get(ids=ids[i:i + self.batch_size], include=[])["ids"])
+        return found
+
+    def exists(self, article_id):
+        return bool(self.existing_ids([article_id]))
+
+    def iter_pages(self, include=("metadatas",), page_size=1000, where=None):
+        """
+        Pages through the collection, fetching only the fields in `include`
+        ("metadatas", "documents", "embeddings"; ids always come back).
+        """
+        offset = 0
+        while True:
+            page = self.collection.get(include=list(include), where=where, limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def iter_metadatas(self, page_size=1000, where=None):
+        """Yields (id, metadata) for every stored article, one page in memory at a time."""
+        for page in self.iter_pages(("metadatas",), page_size, where):
+            yield from zip(page["ids"], page["metadatas"] or [])
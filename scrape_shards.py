@@ -0,0 +1,225 @@
+import os
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+import chromadb
+
+from data_collect import API_KEY, HASH_INDEX_PATH, INDEX_DIR, NEWS_DIR, STATE_DIR, NewsDatabase, NewsScraper
+from news_archive import NewsArchiveWriter
+from shard_ledger import ShardLedger, pending_spool_files, read_spool_file
+
+
+# Sharded scraping: N worker processes (on this machine, or on several machines sharing a filesystem)
+# each run a NewsScraper over their share of the API pages ("offset") or of the news sites ("domain").
+# They claim articles in a shared SQLite ledger (global dedup + per-source quota) and spool their
+# batches as JSONL files; a single coordinator commits the spool to ChromaDB, so only one process
+# ever writes to it.
+#
+# One machine, 4 workers:
+#   python scrape_shards.py --workers 4
+#
+# Several machines sharing /shared (start the coordinator first, it resets the ledger):
+#   python scrape_shards.py --coordinator --shards 4 --work-dir /shared/run
+#   python scrape_shards.py --worker 0 --shards 4 --work-dir /shared/run    (and 1, 2, 3 elsewhere)
+#
+# SQLite locking needs a filesystem with working POSIX locks (local disk, NFSv4 with locking enabled).
+
+LEDGER_FILE = "ledger.sqlite3"
+
+
+def shard_paths(work_dir):
+    return {
+        "ledger": os.path.join(work_dir, LEDGER_FILE),
+        "spool": os.path.join(work_dir, "spool"),
+        "done": os.path.join(work_dir, "done"),
+        "state": os.path.join(work_dir, "state"),
+    }
+
+
+def run_worker(shard_index, shard_count, work_dir, options):
+    """
+    Runs one shard to completion (module-level so it can be a spawned process).
+
+    Args:
+    - shard_index (int): This worker's shard, 0 <= shard_index < shard_count.
+    - shard_count (int): Total number of workers.
+    - work_dir (str): Directory shared with the coordinator (ledger, spool, done markers).
+    - options (dict): Extra NewsScraper keyword arguments (max_articles, max_api_calls, ...).
+    """
+    paths = shard_paths(work_dir)
+    ledger = ShardLedger(paths["ledger"])
+    scraper = NewsScraper(
+        **options,
+        save_json=False,  # The coordinator archives what it commits
+        shard_index=shard_index,
+        shard_count=shard_count,
+        ledger=ledger,
+        spool_dir=paths["spool"],
+        state_dir=os.path.join(paths["state"], f"shard{shard_index}"),
+    )
+
+    async def scrape():
+        try:
+            await scraper.fetch_articles()
+        finally:
+            await scraper.close_browser()
+
+    status = "failed"
+    try:
+        asyncio.run(scrape())
+        status = "ok"
+    finally:
+        scraper.close_parse_pool()
+        ledger.close()
+        # Tells the coordinator this shard won't spool anything else
+        os.makedirs(paths["done"], exist_ok=True)
+        with open(os.path.join(paths["done"], f"shard{shard_index}.done"), "w", encoding="utf-8") as f:
+            f.write(status)
+        print(f"🏁 Shard {shard_index}/{shard_count} finished ({status}): {scraper.articles_fetched} articles spooled.")
+
+
+class ShardCoordinator:
+    def __init__(self, db_client, work_dir, shard_count, index_dir=INDEX_DIR, news_dir=NEWS_DIR, save_json=True,
+                 poll_interval=5):
+        """
+        Args:
+        - db_client: ChromaDB client the spooled batches are committed to.
+        - work_dir (str): Directory shared with the workers.
+        - shard_count (int): Number of workers to wait for.
+        - index_dir (str): Directory of the hash index shared with the workers.
+        - news_dir (str): Where committed articles are archived (if save_json).
+        - save_json (bool): Archive committed articles to NEWS_FILES like a single-process run.
+        - poll_interval (float): Seconds between spool scans.
+        """
+        self.paths = shard_paths(work_dir)
+        self.shard_count = shard_count
+        self.poll_interval = poll_interval
+        self.database = NewsDatabase(
+            db_client, index_path=os.path.join(index_dir, os.path.basename(HASH_INDEX_PATH))
+        )
+        self.archive = NewsArchiveWriter(news_dir) if save_json else None
+
+    def reset(self):
+        """Starts a new run: clears the ledger, leftover done markers and the temp files of dead workers."""
+        ledger = ShardLedger(self.paths["ledger"])
+        ledger.reset()
+        ledger.close()
+        for directory in (self.paths["done"], self.paths["spool"]):
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name.endswith((".done", ".tmp")):
+                    os.remove(os.path.join(directory, name))
+        # Spooled batches from an interrupted run are still committed below
+
+    def finished_shards(self):
+        if not os.path.isdir(self.paths["done"]):
+            return []
+        return [name for name in os.listdir(self.paths["done"]) if name.endswith(".done")]
+
+    def merge_pending(self):
+        """Commits every complete spool file, oldest first. Returns the number of articles committed."""
+        committed = 0
+        commit_failed = False  # After one failure this pass only archives; commits are retried next pass
+        for path in pending_spool_files(self.paths["spool"]):
+            try:
+                articles = read_spool_file(path)
+            except ValueError as e:
+                print(f"⚠️ Unreadable spool file {path} ({e}), moving it aside.")
+                os.replace(path, f"{path}.bad")
+                continue
+
+            # Workers only see what was committed before they checked, so filter again here
+            fresh = [article for article in articles if article.get("hash") not in self.database.existing_ids]
+            if fresh:
+                # Archive first, like NewsScraper.write_batch, so NEWS_FILES doesn't depend on ChromaDB.
+                # The marker keeps a file that's retried (here or after a restart) from being archived twice.
+                archived_marker = f"{path}.archived"
+                if self.archive and not os.path.exists(archived_marker):
+                    self.archive.append(fresh)
+                    open(archived_marker, "w").close()
+                if commit_failed:
+                    continue
+                if not self.database.commit_batch(fresh):
+                    print(f"⚠️ Commit failed, will retry {path} on the next pass.")
+                    commit_failed = True
+                    continue
+                committed += len(fresh)
+            os.remove(path)
+            if os.path.exists(f"{path}.archived"):
+                os.remove(f"{path}.archived")
+        return committed
+
+    def run(self, processes=()):
+        """Merges spooled batches until every shard is done (or every local worker has exited)."""
+        while True:
+            merged = self.merge_pending()
+            if merged:
+                print(f"🔀 Coordinator committed {merged} articles ({self.database.total_articles_saved} this run).")
+            if len(self.finished_shards()) >= self.shard_count:
+                break
+            if processes and not any(process.is_alive() for process in processes):
+                print("⚠️ Every local worker has exited without finishing its shard.")
+                break
+            time.sleep(self.poll_interval)
+
+        for process in processes:
+            process.join()
+        self.merge_pending()  # Batches spooled between the last scan and the workers exiting
+        print(f"✅ Sharded run complete: {self.database.total_articles_saved} articles committed to ChromaDB.")
+
+
+def start_local_workers(shard_count, work_dir, options):
+    """Starts every shard as a separate process on this machine."""
+    context = multiprocessing.get_context("spawn")  # Each worker gets its own event loop, parser pool and browser
+    processes = [
+        context.Process(target=run_worker, args=(i, shard_count, work_dir, options), name=f"shard{i}")
+        for i in range(shard_count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sharded multi-process news scraping.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--workers", type=int, help="Run a coordinator and this many local workers (default mode, 4)")
+    mode.add_argument("--worker", type=int, metavar="INDEX", help="Run only shard INDEX of --shards")
+    mode.add_argument("--coordinator", action="store_true", help="Only merge the spool of --shards remote workers")
+    parser.add_argument("--shards", type=int, help="Total number of shards (with --worker / --coordinator)")
+    parser.add_argument("--work-dir", default=os.path.join(STATE_DIR, "shards"))
+    parser.add_argument("--shard-by", choices=["offset", "domain"], default="offset",
+                        help="Split API pages between workers, or news sites (every worker then reads every page)")
+    parser.add_argument("--api-key", default=API_KEY)
+    parser.add_argument("--max-articles", type=int, default=250)
+    parser.add_argument("--max-api-calls", type=int, default=5)
+    parser.add_argument("--max-per-source", type=int, default=5)
+    parser.add_argument("--api-calls-per-minute", type=float, default=4,
+                        help="mediastack budget for the whole run; split evenly between the workers")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    shard_count = args.shards or args.workers or 4
+    if (args.worker is not None or args.coordinator) and not args.shards:
+        raise SystemExit("--shards is required with --worker / --coordinator")
+
+    options = {
+        "api_key": args.api_key,
+        "max_articles": args.max_articles,
+        "max_api_calls": args.max_api_calls,
+        "max_per_source": args.max_per_source,
+        "shard_by": args.shard_by,
+        "api_calls_per_minute": args.api_calls_per_minute / shard_count,
+    }
+
+    if args.worker is not None:
+        run_worker(args.worker, shard_count, args.work_dir, options)
+    else:
+        coordinator = ShardCoordinator(chromadb.PersistentClient(path="./chroma_db"), args.work_dir, shard_count)
+        coordinator.reset()
+        processes = [] if args.coordinator else start_local_workers(shard_count, args.work_dir, options)
+        coordinator.run(processes)
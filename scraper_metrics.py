@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Lightweight metrics for the scraper: latency histograms and labelled counters, exported in the
+# Prometheus text format (file or HTTP endpoint) and as a JSON run summary. No external dependencies.
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class ScraperMetrics:
+    def __init__(self, prefix="scraper", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.lock = threading.Lock()  # Commits are recorded from the commit worker thread
+        self.histograms = {}  # (name, label_key) -> {"counts": [...], "sum": float, "count": int}
+        self.counters = defaultdict(float)  # (name, label_key) -> value
+        self.started = time.time()
+        self.server = None
+
+    # ---------- recording ----------
+
+    def observe(self, name, seconds, **labels):
+        """Records one latency sample (in seconds) in a histogram."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["counts"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def inc(self, name, amount=1, **labels):
+        """Adds to a labelled counter."""
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times a block: `with metrics.timer("stage_seconds", stage="api_call"): ...`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # ---------- exporting ----------
+
+    def percentile(self, histogram, q):
+        """Approximates a percentile by interpolating inside the histogram bucket that contains it."""
+        if not histogram["count"]:
+            return 0.0
+        target = q * histogram["count"]
+        seen, lower = 0, 0.0
+        for bound, count in zip(self.buckets, histogram["counts"]):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]  # Sample beyond the largest bucket
+
+    def to_prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (hist_name, label_key), histogram in sorted(self.histograms.items()):
+                    if hist_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram["counts"]):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(label_key, {'le': bound})} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(label_key, {'le': '+Inf'})} {histogram['count']}")
+                    lines.append(f"{metric}_sum{_format_labels(label_key)} {histogram['sum']:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(label_key)} {histogram['count']}")
+
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, label_key), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{_format_labels(label_key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """JSON-friendly summary: p50/p95/mean per histogram and the value of every counter."""
+        with self.lock:
+            histograms = {
+                f"{name}{_format_labels(label_key)}": {
+                    "count": histogram["count"],
+                    "mean": round(histogram["sum"] / histogram["count"], 4) if histogram["count"] else 0.0,
+                    "p50": round(self.percentile(histogram, 0.50), 4),
+                    "p95": round(self.percentile(histogram, 0.95), 4),
+                }
+                for (name, label_key), histogram in sorted(self.histograms.items())
+            }
+            counters = {
+                f"{name}{_format_labels(label_key)}": value
+                for (name, label_key), value in sorted(self.counters.items())
+            }
+        return {"elapsed_seconds": round(time.time() - self.started, 2), "latency": histograms, "counters": counters}
+
+    @staticmethod
+    def _write_atomic(path, text):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def write_prometheus(self, path):
+        """Writes the metrics file (e.g. for node_exporter's textfile collector)."""
+        self._write_atomic(path, self.to_prometheus())
+
+    def write_summary(self, path, extra=None):
+        """Writes the JSON run summary, merged with any extra run information."""
+        self._write_atomic(path, json.dumps({**(extra or {}), "metrics": self.summary()}, indent=2, default=str))
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serves /metrics over HTTP from a background thread."""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the scraper's output
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics endpoint: http://{host}:{port}/metrics")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
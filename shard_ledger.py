@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import threading
+
+from hash_index import to_digest
+
+
+# Shared state for sharded scraping (see scrape_shards.py).
+# Worker processes, possibly on several machines sharing a filesystem, claim articles in one SQLite
+# ledger, so an article is fetched by a single worker and each source's quota holds across all of them.
+# Workers don't write to ChromaDB: they spool finished batches as JSONL files the coordinator commits.
+
+def shard_for(key, shard_count):
+    """Stable shard number for a key (e.g. a domain), identical in every process and run."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") % shard_count
+
+
+class ShardLedger:
+    def __init__(self, path):
+        """
+        Args:
+        - path (str): SQLite file shared by every worker of the run.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE below
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS claims (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+
+    def claim(self, keys, source, max_per_source, max_total):
+        """
+        Atomically claims an article for this worker.
+
+        Returns None if the claim succeeded, "duplicate_in_run" if another worker already has one of
+        its keys (hash / normalized URL), or "source_quota" / "max_articles" if the global limits are
+        reached (counting articles still in flight).
+        """
+        digests = [to_digest(key) for key in keys if key]
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")  # Takes the write lock, so check-and-insert can't interleave
+            try:
+                placeholders = ",".join("?" * len(digests))
+                if digests and self.db.execute(
+                        f"SELECT 1 FROM claims WHERE digest IN ({placeholders})", digests).fetchone():
+                    reason = "duplicate_in_run"
+                else:
+                    row = self.db.execute("SELECT count FROM sources WHERE source = ?", (source,)).fetchone()
+                    total = self.db.execute("SELECT COALESCE(SUM(count), 0) FROM sources").fetchone()[0]
+                    if row and row[0] >= max_per_source:
+                        reason = "source_quota"
+                    elif total >= max_total:
+                        reason = "max_articles"
+                    else:
+                        reason = None
+                        self.db.executemany("INSERT OR IGNORE INTO claims (digest) VALUES (?)", [(d,) for d in digests])
+                        self.db.execute(
+                            "INSERT INTO sources (source, count) VALUES (?, 1) "
+                            "ON CONFLICT(source) DO UPDATE SET count = count + 1", (source,)
+                        )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return reason
+
+    def release(self, source):
+        """
+        Gives a claimed article's quota slot back (extraction failed or it was a near-duplicate).
+
+        Its keys stay claimed, so no other worker retries it.
+        """
+        with self.lock:
+            self.db.execute("UPDATE sources SET count = count - 1 WHERE source = ? AND count > 0", (source,))
+
+    def total(self):
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(count), 0) FROM sources").fetchone()[0]
+
+    def reset(self):
+        """Clears all claims and counts (the coordinator does this when a new run starts)."""
+        with self.lock:
+            self.db.execute("DELETE FROM claims")
+            self.db.execute("DELETE FROM sources")
+
+    def close(self):
+        self.db.close()
+
+
+class SpoolWriter:
+    """Writes a worker's batches to the spool directory, one complete JSONL file per batch."""
+
+    def __init__(self, spool_dir, shard_index):
+        self.spool_dir = spool_dir
+        # Host and pid keep names unique when workers on several machines share the directory
+        self.prefix = f"shard{shard_index}-{socket.gethostname()}-{os.getpid()}"
+        self.sequence = 0
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def write(self, articles):
+        """Writes a batch atomically (temp file + rename) and returns its path."""
+        self.sequence += 1
+        path = os.path.join(self.spool_dir, f"{int(time.time() * 1000)}-{self.prefix}-{self.sequence:06d}.jsonl")
+        tmp_path = f"{path}.tmp"  # The coordinator only picks up *.jsonl
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for article in articles:
+                f.write(json.dumps(article, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+
+def pending_spool_files(spool_dir):
+    """Spooled batches waiting to be committed, oldest first."""
+    if not os.path.isdir(spool_dir):
+        return []
+    return sorted(os.path.join(spool_dir, name) for name in os.listdir(spool_dir) if name.endswith(".jsonl"))
+
+
+def read_spool_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,29 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_archive import iter_json_array
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 16))
+def test_numbers_split_by_the_chunk_boundary(chunk_size):
+    # With small chunks a number like 456 ends up cut as "45" | "6"; it must still come back whole
+    assert list(iter_json_array(io.StringIO("[1, 23, 456]"), chunk_size=chunk_size)) == [1, 23, 456]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_articles_list_and_wrapper_object(chunk_size):
+    articles = [{"title": f"t{i}", "url": f"https://example.com/{i}", "score": i * 111} for i in range(5)]
+    assert list(iter_json_array(io.StringIO(json.dumps(articles)), chunk_size=chunk_size)) == articles
+    wrapped = json.dumps({"status": "ok", "articles": articles})
+    assert list(iter_json_array(io.StringIO(wrapped), chunk_size=chunk_size)) == articles
+
+
+def test_truncated_file_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"title": "a"}, {"title": "b"'), chunk_size=4))